@@ -1,65 +1,210 @@
-import pandas as pd
-
-def preprocess_df(df, date_col, date_format, freq='W-FRI'):
-    df[date_col] = pd.to_datetime(df[date_col], format=date_format)
-    df.set_index(date_col, inplace=True)
-    weekly_dates = pd.date_range(start=df.index.min(), end=df.index.max(), freq=freq)
-    weekly_df = df.reindex(weekly_dates).interpolate(method='linear')
-    weekly_df.reset_index(inplace=True)
-    weekly_df.rename(columns={'index': 'DATE'}, inplace=True)
-    return weekly_df
-
-ng_df = pd.read_csv('NG_new/NG1.csv')
-ng_df = preprocess_df(ng_df, 'Week of', '%m/%d/%Y')
-
-imports_df = pd.read_csv('NG_new/imports.csv')
-imports_df = preprocess_df(imports_df, 'Month', '%b %Y')
-imports_df.rename(columns={'U.S. Natural Gas Imports MMcf': 'Imports_MMcf'}, inplace=True)
-
-exports_df = pd.read_csv('NG_new/exports.csv')
-exports_df = preprocess_df(exports_df, 'Month', '%b %Y')
-exports_df.rename(columns={'U.S. Natural Gas Exports MMcf': 'Exports_MMcf'}, inplace=True)
-
-combined_df = pd.merge(ng_df, imports_df, on='DATE', how='left')
-combined_df = pd.merge(combined_df, exports_df, on='DATE', how='left')
-combined_df.dropna(subset=['Imports_MMcf', 'Exports_MMcf'], inplace=True)
+import argparse
+import os
+import sys
 
-crude_df = pd.read_csv('NG_new/crude_oil.csv')
-crude_df = preprocess_df(crude_df, 'Week of', '%m/%d/%Y')
-crude_df.rename(columns={'Cushing OK Crude Oil Future Contract 1 $/bbl': 'Crude_Oil_Price'}, inplace=True)
-
-final_df = pd.merge(combined_df, crude_df, on='DATE', how='left')
-
-cpi_df = pd.read_csv('NG_new/CPI.csv')
-cpi_df = preprocess_df(cpi_df, 'DATE', '%Y-%m-%d')
-cpi_df.rename(columns={'MEDCPIM158SFRBCLE': 'CPI'}, inplace=True)
-
-final_df = pd.merge(final_df, cpi_df, on='DATE', how='left')
+import pandas as pd
 
-storms_df = pd.read_csv('NG_new/storms.csv')
-storms_df['datetime'] = pd.to_datetime(storms_df[['year', 'month', 'day', 'hour']])
-storms_df.set_index('datetime', inplace=True)
-weekly_storms_df = storms_df.resample('W-FRI').agg({
-    'wind': 'mean',
-    'pressure': 'mean',
-    'tropicalstorm_force_diameter': 'mean',
-    'hurricane_force_diameter': 'mean'
-}).reset_index()
-weekly_storms_df.rename(columns={'datetime': 'DATE'}, inplace=True)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ngforecast import instrumentation
+from ngforecast.alignment import align_sources, load_sources
+from ngforecast.config import SCHEMA_PATH, TARGET
+from ngforecast.dataset_store import source_stat, store_path, write_store
+from ngforecast.features import build_features, lookback
+from ngforecast.result_cache import file_hash
+from ngforecast.schema import apply_schema, dtypes, infer_schema, write_schema
 
-final_df = pd.merge(final_df, weekly_storms_df, on='DATE', how='left')
+OUTPUT_PATH = 'NG_new/NG_dataset.csv'
+CACHE_DIR = 'NG_new/.preprocess_cache'
 
 n_lags = 4
 
 columns_to_lag = ['Natural Gas Futures Contract 1 $/MMBTU', 'Crude_Oil_Price', 'Imports_MMcf', 'Exports_MMcf' ,'CPI']
 
-for column in columns_to_lag:
-    for lag in range(1, n_lags + 1):
-        final_df[f'{column}_Lag_{lag}'] = final_df[column].shift(lag)
-
-final_df.set_index('DATE', inplace=False)
-for col in final_df.columns:
-    if final_df[col].dtype == 'object':
-        final_df[col] = final_df[col].str.replace(',', '').astype(float)
-
-final_df.to_csv('NG_new/NG_dataset.csv', index=False)
+# Units of the source columns; derived features inherit them in the schema
+UNITS = {
+    TARGET: '$/MMBTU',
+    'Imports_MMcf': 'MMcf',
+    'Exports_MMcf': 'MMcf',
+    'Crude_Oil_Price': '$/bbl',
+    'CPI': '% annual rate',
+    'wind': 'kt',
+    'pressure': 'mb',
+    'tropicalstorm_force_diameter': 'nmi',
+    'hurricane_force_diameter': 'nmi',
+}
+
+# NaN policy of the source columns; lag and rolling features always allow NaN. Imports and
+# exports are required sources, while the others can trail the NG dates after an append
+NAN_POLICY = {
+    TARGET: 'forbid',
+    'Imports_MMcf': 'forbid',
+    'Exports_MMcf': 'forbid',
+    'Crude_Oil_Price': 'allow',
+    'CPI': 'allow',
+    'wind': 'allow',
+    'pressure': 'allow',
+    'tropicalstorm_force_diameter': 'allow',
+    'hurricane_force_diameter': 'allow',
+}
+
+# Extra transforms (rolling_mean, rolling_std, pct_change) can be added to a spec or as new specs
+feature_specs = [
+    {'columns': columns_to_lag, 'lags': range(1, n_lags + 1)},
+]
+
+# Declarative source list, parsed concurrently and aligned onto the NG weekly dates by
+# ngforecast.alignment. Rows without imports or exports are dropped.
+SOURCES = [
+    {'name': 'ng', 'path': 'NG_new/NG1.csv', 'date_column': 'Week of', 'format': '%m/%d/%Y',
+     'align': 'interpolate'},
+    {'name': 'imports', 'path': 'NG_new/imports.csv', 'date_column': 'Month', 'format': '%b %Y',
+     'align': 'interpolate', 'rename': {'U.S. Natural Gas Imports MMcf': 'Imports_MMcf'}, 'required': True},
+    {'name': 'exports', 'path': 'NG_new/exports.csv', 'date_column': 'Month', 'format': '%b %Y',
+     'align': 'interpolate', 'rename': {'U.S. Natural Gas Exports MMcf': 'Exports_MMcf'}, 'required': True},
+    {'name': 'crude', 'path': 'NG_new/crude_oil.csv', 'date_column': 'Week of', 'format': '%m/%d/%Y',
+     'align': 'interpolate', 'rename': {'Cushing OK Crude Oil Future Contract 1 $/bbl': 'Crude_Oil_Price'}},
+    {'name': 'cpi', 'path': 'NG_new/CPI.csv', 'date_column': 'DATE', 'format': '%Y-%m-%d',
+     'align': 'interpolate', 'rename': {'MEDCPIM158SFRBCLE': 'CPI'}},
+    {'name': 'storms', 'path': 'NG_new/storms.csv', 'date_column': ['year', 'month', 'day', 'hour'],
+     'align': 'mean', 'columns': ['wind', 'pressure', 'tropicalstorm_force_diameter', 'hurricane_force_diameter']},
+]
+
+def merge_sources(weekly):
+    with instrumentation.stage('align'):
+        return align_sources(weekly, SOURCES)
+
+def add_features(final_df):
+    return build_features(final_df, feature_specs)
+
+def to_numeric(final_df):
+    # Sources are parsed with thousands separators, so this only converts frames cached before that
+    for col in final_df.columns:
+        if final_df[col].dtype == 'object':
+            final_df[col] = final_df[col].str.replace(',', '').astype(float)
+    return final_df
+
+def build_dataset(weekly=None, workers=None):
+    if weekly is None:
+        weekly = load_sources(SOURCES, workers)
+    final_df = to_numeric(merge_sources(weekly))
+    with instrumentation.stage('features'):
+        return add_features(final_df)
+
+# Incremental mode: every source is fingerprinted and its weekly-aligned frame cached
+# as a pickle. Only rows from the earliest changed week onwards are rebuilt; rows before
+# it (and the rows of context the feature specs need) come from the cached dataset.
+
+def read_cache(cache_dir, name):
+    path = os.path.join(cache_dir, f'{name}.pkl')
+    return pd.read_pickle(path) if os.path.exists(path) else None
+
+def write_cache(cache_dir, name, entry):
+    os.makedirs(cache_dir, exist_ok=True)
+    pd.to_pickle(entry, os.path.join(cache_dir, f'{name}.pkl'))
+
+def first_changed_date(old, new):
+    """Earliest DATE at which two weekly frames differ, or None if they are identical."""
+    if list(old.columns) != list(new.columns):
+        return min(old['DATE'].min(), new['DATE'].min())
+    n = min(len(old), len(new))
+    old_head = old.iloc[:n].reset_index(drop=True)
+    new_head = new.iloc[:n].reset_index(drop=True)
+    changed = ~((old_head == new_head) | (old_head.isna() & new_head.isna())).all(axis=1)
+    if changed.any():
+        k = changed.idxmax()
+        return min(old_head['DATE'][k], new_head['DATE'][k])
+    if len(new) > n:
+        return new['DATE'].iloc[n]
+    if len(old) > n:
+        return old['DATE'].iloc[n]
+    return None
+
+def load_sources_cached(cache_dir, workers=None):
+    """Weekly frames for every source plus the earliest week any of them changed."""
+    weekly = {}
+    cached = {}
+    stale = []
+    for spec in SOURCES:
+        name = spec['name']
+        cached[name] = read_cache(cache_dir, name)
+        stat = source_stat(spec['path'])
+        if cached[name] is not None and cached[name]['stat'] == stat:
+            weekly[name] = cached[name]['weekly']
+            continue
+
+        fingerprint = file_hash(spec['path'])
+        if cached[name] is not None and cached[name]['fingerprint'] == fingerprint:
+            weekly[name] = cached[name]['weekly']
+            write_cache(cache_dir, name, {'stat': stat, 'fingerprint': fingerprint, 'weekly': weekly[name]})
+        else:
+            stale.append((spec, stat, fingerprint))
+
+    # Changed sources are re-parsed together in the pool
+    dirty_dates = []
+    loaded = load_sources([spec for spec, _, _ in stale], workers) if stale else {}
+    for spec, stat, fingerprint in stale:
+        name = spec['name']
+        weekly[name] = loaded[name]
+        if cached[name] is None:
+            dirty_dates.append(pd.Timestamp.min)
+        else:
+            changed = first_changed_date(cached[name]['weekly'], weekly[name])
+            if changed is not None:
+                dirty_dates.append(changed)
+        write_cache(cache_dir, name, {'stat': stat, 'fingerprint': fingerprint, 'weekly': weekly[name]})
+
+    return weekly, (min(dirty_dates) if dirty_dates else None)
+
+def rebuild_tail(weekly, cached_final, dirty_date):
+    head = cached_final[cached_final['DATE'] < dirty_date]
+    tail = merge_sources({name: df[df['DATE'] >= dirty_date] for name, df in weekly.items()})
+    context = head[tail.columns].tail(lookback(feature_specs))
+    tail = add_features(pd.concat([context, to_numeric(tail)], ignore_index=True)).iloc[len(context):]
+    return pd.concat([head, tail], ignore_index=True)
+
+def build_dataset_incremental(cache_dir=CACHE_DIR, workers=None):
+    weekly, dirty_date = load_sources_cached(cache_dir, workers)
+    cached_final = read_cache(cache_dir, 'dataset')
+
+    if cached_final is None:
+        final_df = build_dataset(weekly)
+    elif dirty_date is None:
+        final_df = cached_final
+    else:
+        final_df = rebuild_tail(weekly, cached_final, dirty_date)
+
+    if dirty_date is not None or cached_final is None:
+        write_cache(cache_dir, 'dataset', final_df)
+    return final_df, dirty_date is not None or cached_final is None
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build NG_new/NG_dataset.csv from the source CSVs.')
+    parser.add_argument('--incremental', action='store_true',
+                        help='reuse cached sources and rebuild only the rows from the earliest changed week')
+    parser.add_argument('--verify', action='store_true', help='check the incremental output against a full rebuild')
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--workers', type=int, default=None, help='threads parsing source CSVs (default: one per source)')
+    parser.add_argument('--trace', default=None, help='write a Chrome-trace JSON of the run to this path')
+    args = parser.parse_args()
+    if args.trace:
+        instrumentation.enable(args.trace)
+
+    if args.incremental:
+        final_df, changed = build_dataset_incremental(args.cache_dir, args.workers)
+        if args.verify:
+            pd.testing.assert_frame_equal(final_df, build_dataset(workers=args.workers))
+            print('Incremental build matches a full rebuild.')
+        if not changed and os.path.exists(OUTPUT_PATH):
+            sys.exit(0)
+    else:
+        final_df = build_dataset(workers=args.workers)
+
+    # Typed schema (float32 features, float64 target) used by train.py, N_finder.py and test_sim.py
+    schema = infer_schema(final_df, TARGET, UNITS, NAN_POLICY)
+    final_df = apply_schema(final_df, schema, OUTPUT_PATH)
+
+    with instrumentation.stage('write output'):
+        write_schema(schema, SCHEMA_PATH)
+        final_df.to_csv(OUTPUT_PATH, index=False)
+        # Columnar, memory-mappable copy read by train.py, N_finder.py and test_sim.py
+        write_store(final_df, store_path(OUTPUT_PATH), source=OUTPUT_PATH, dtypes=dtypes(schema))
@@ -1,17 +1,87 @@
+import argparse
+import os
+import sys
 import pandas as pd
 from sklearn.model_selection import train_test_split, RandomizedSearchCV
 from sklearn.metrics import mean_absolute_error, mean_squared_error
 import catboost as cb
 import json
 
-data = pd.read_csv('NG_new/NG_dataset.csv')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ngforecast import instrumentation
+from ngforecast.cross_validation import cross_validate, cv_search, write_oof_predictions
+from ngforecast.dataset_store import load_dataset
+from ngforecast.model import load_model
+from ngforecast.retrain import read_train_state, warm_start_retrain, write_train_state
+from ngforecast.schema import read_schema
+from ngforecast.tuning import successive_halving
+
+parser = argparse.ArgumentParser(description='Train the NG CatBoost model.')
+parser.add_argument('--search', choices=['random', 'halving'], default='random',
+                    help='RandomizedSearchCV (default) or budgeted successive halving with early stopping')
+parser.add_argument('--threads', type=int, default=None, help='total CPU threads for the search')
+parser.add_argument('--trial-workers', type=int, default=None, help='halving trials trained in parallel')
+parser.add_argument('--time-budget', type=float, default=None, help='wall-clock cap in seconds for the halving search')
+parser.add_argument('--retrain', action='store_true',
+                    help='continue boosting the saved model on weeks appended since the last run; '
+                         'falls back to a full search if validation error drifted')
+parser.add_argument('--recent-weeks', type=int, default=104, help='trailing window the warm start is fitted on')
+parser.add_argument('--retrain-iterations', type=int, default=100, help='trees added by a warm start')
+parser.add_argument('--drift-threshold', type=float, default=1.5,
+                    help='max ratio of new-week MAE to the last full training MAE before a full search')
+parser.add_argument('--cv', choices=['shuffle', 'expanding'], default='shuffle',
+                    help='shuffled split and 3-fold CV (default) or a time-ordered holdout with '
+                         'expanding-window CV, cached fold models and out-of-fold predictions')
+parser.add_argument('--cv-splits', type=int, default=3, help='expanding-window folds')
+parser.add_argument('--fold-workers', type=int, default=None, help='CV folds trained in parallel')
+parser.add_argument('--trace', default=None, help='write a Chrome-trace JSON of the run to this path')
+args = parser.parse_args()
+if args.search == 'halving' and args.cv == 'expanding':
+    parser.error('--search halving scores on its own time-ordered eval set and cannot be combined with --cv expanding')
+if args.trace:
+    instrumentation.enable(args.trace)
+
+model_file_path = 'NG_new/catboost_ng_model.bin'
+params_file_path = 'NG_new/best_params.json'
+state_file_path = 'NG_new/train_state.json'
+schema_path = 'NG_new/dataset_schema.json'  # Written by preprocess.py: float32 features, float64 target
+cv_cache_dir = 'NG_new/.cv_cache'  # Fold models and predictions keyed by (params, fold, data hash)
+oof_file_path = 'NG_new/oof_predictions.csv'  # Leak-free predictions for N_finder.py --oof
+
+data = load_dataset('NG_new/NG_dataset.csv', schema=read_schema(schema_path))
 
-data['DATE'] = pd.to_datetime(data['DATE'])
 target = 'Natural Gas Futures Contract 1 $/MMBTU'
-features = data.columns.difference(['DATE', target])
+features = data.columns.difference([target])
 X = data[features]
 y = data[target]
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+if args.retrain:
+    state = read_train_state(state_file_path)
+    if state is None:
+        print(f"No training state in {state_file_path}, running a full search.")
+    else:
+        new_rows = data.index > pd.Timestamp(state['last_date'])
+        if not new_rows.any():
+            print("No new weeks since the last training run.")
+            sys.exit(0)
+
+        loaded_model, loaded_params = load_model(model_file_path, params_file_path)
+        updated_model, new_mae = warm_start_retrain(loaded_model, loaded_params, X[new_rows], y[new_rows],
+                                                    X.iloc[-args.recent_weeks:], y.iloc[-args.recent_weeks:],
+                                                    state['mae'], args.drift_threshold, args.retrain_iterations,
+                                                    args.threads or -1)
+        print(f'Mean Absolute Error on {new_rows.sum()} new weeks: {new_mae} (last training: {state["mae"]})')
+        if updated_model is not None:
+            updated_model.save_model(model_file_path)
+            write_train_state(state_file_path, data.index.max().date(), state['mae'])
+            sys.exit(0)
+        print("Validation error drifted past the threshold, running a full search.")
+
+if args.cv == 'expanding':
+    # Oldest 80% for the search, the latest 20% held out, so no fold or test row precedes its training data
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
+else:
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
 param_grid = {
     'iterations': [100, 500, 1000],
@@ -21,29 +91,53 @@ param_grid = {
     'border_count': [32, 50, 100]
 }
 
-catboost_model = cb.CatBoostRegressor(loss_function='MAE', verbose=0)
-random_search = RandomizedSearchCV(catboost_model, param_distributions=param_grid, n_iter=50, cv=3, scoring='neg_mean_absolute_error', random_state=42, n_jobs=-1)
-random_search.fit(X_train, y_train)
+with instrumentation.stage('search', method=args.search):
+    if args.search == 'halving':
+        best_params, best_score = successive_halving(X_train, y_train, param_grid, n_candidates=50,
+                                                     min_iterations=min(param_grid['iterations']),
+                                                     max_iterations=max(param_grid['iterations']),
+                                                     n_threads=args.threads, trial_workers=args.trial_workers,
+                                                     time_budget=args.time_budget)
+        thread_count = args.threads or -1
+    elif args.cv == 'expanding':
+        best_params, best_score, _ = cv_search(X_train, y_train, param_grid, n_candidates=50,
+                                               n_splits=args.cv_splits, cache_dir=cv_cache_dir,
+                                               n_threads=args.threads, fold_workers=args.fold_workers)
+        thread_count = args.threads or -1
+    else:
+        catboost_model = cb.CatBoostRegressor(loss_function='MAE', verbose=0)
+        random_search = RandomizedSearchCV(catboost_model, param_distributions=param_grid, n_iter=50, cv=3, scoring='neg_mean_absolute_error', random_state=42, n_jobs=-1)
+        random_search.fit(X_train, y_train)
+        best_params = random_search.best_params_
+        thread_count = -1
 
-best_params = random_search.best_params_
 print("Best Parameters:", best_params)
 
-best_model = cb.CatBoostRegressor(**best_params, loss_function='MAE')
-best_model.fit(X_train, y_train)
+best_model = cb.CatBoostRegressor(**best_params, loss_function='MAE', thread_count=thread_count)
+with instrumentation.stage('fit'):
+    best_model.fit(X_train, y_train)
 
-best_model.save_model('NG_new/catboost_ng_model.bin')
+best_model.save_model(model_file_path)
 
-params_file_path = 'NG_new/best_params.json'
 with open(params_file_path, 'w') as f:
     json.dump(best_params, f)
 
-y_pred = best_model.predict(X_test)
+y_pred = instrumentation.predict(best_model, X_test)
 
 mae = mean_absolute_error(y_test, y_pred)
 print(f'Mean Absolute Error: {mae}')
+write_train_state(state_file_path, data.index.max().date(), mae)
 rmse = mean_squared_error(y_test, y_pred, squared=False)
 print(f'Root Mean Squared Error: {rmse}')
 
+if args.cv == 'expanding':
+    # Out-of-fold predictions of the chosen parameters (cached folds after cv_search), followed by
+    # the held-out weeks scored by the final model: every value comes from a model fitted on earlier weeks
+    oof = cross_validate(X_train, y_train, best_params, n_splits=args.cv_splits, cache_dir=cv_cache_dir,
+                         n_threads=args.threads, fold_workers=args.fold_workers)['oof']
+    write_oof_predictions(oof_file_path, pd.concat([oof, pd.Series(y_pred, index=X_test.index)]))
+    print(f"Out-of-fold predictions for {oof.index[0].date()} onwards written to {oof_file_path}")
+
 feature_importances = best_model.get_feature_importance()
 feature_importance_df = pd.DataFrame({'Feature': features, 'Importance': feature_importances})
 print(feature_importance_df.sort_values(by='Importance', ascending=False))
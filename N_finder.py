@@ -1,173 +1,136 @@
-"""N finder, a hit and trial method to find the most optimum N, for a given risk tolerance and trade threshold."""
+"""N finder, a hit and trial method to find the most optimum N, for a given risk tolerance and trade threshold.
+
+Importing this module loads nothing: the model, the data and matplotlib are loaded the
+first time a function needs them, through a ``BacktestSession``. ``python N_finder.py``
+sweeps N and shows the plots as before; ``--output-dir`` runs headless and writes the
+figures and result tables there instead. Several ``--risk-tolerance`` and ``--threshold``
+values sweep every combination in one process on a single set of predictions.
+``--walk-forward`` re-picks N out of sample from a trailing window instead of sweeping the
+whole period once.
+"""
+
+import argparse
+import itertools
+import os
 
 import pandas as pd
-import catboost as cb
-import json
-import os
-import numpy as np
-import matplotlib.pyplot as plt
-
-# Load the model and parameters
-model_file_path = 'NG_new/catboost_ng_model.bin'
-params_file_path = 'NG_new/best_params.json'
-
-if os.path.exists(model_file_path):
-    loaded_model = cb.CatBoostRegressor()
-    loaded_model.load_model(model_file_path)
-else:
-    raise FileNotFoundError(f"Model file {model_file_path} does not exist.")
-
-if os.path.exists(params_file_path):
-    with open(params_file_path, 'r') as f:
-        loaded_best_params = json.load(f)
-    print("Loaded Best Parameters:", loaded_best_params)
-else:
-    raise FileNotFoundError(f"Parameters file {params_file_path} does not exist.")
-
-# Load and prepare data
-new_data = pd.read_csv('NG_new/test.csv')
-new_data['DATE'] = pd.to_datetime(new_data['DATE'])
-new_data.set_index('DATE', inplace=True)
-
-features = [col for col in new_data.columns if col not in ['Natural Gas Futures Contract 1 $/MMBTU']]
-weekly_X = new_data[features]
-
-def calculate_percentage_change(values, N):
-    pct_changes = []
-    for i in range(len(values) - N):
-        pct_change = ((values[i + N] - values[i]) / values[i]) * 100
-        pct_changes.append(pct_change)
-    return pct_changes
-
-def backtest_model(N, weekly_X, new_data, initial_aum=1000000, risk_tolerance=0.75, threshold=15):
-    weekly_predictions = loaded_model.predict(weekly_X)
-
-    percentage_changes_pred = calculate_percentage_change(weekly_predictions, N)
-    y_true = new_data['Natural Gas Futures Contract 1 $/MMBTU'].values
-    percentage_changes_true = calculate_percentage_change(y_true, N)
-
-    min_length = min(len(percentage_changes_pred), len(percentage_changes_true))
-    percentage_changes_pred = percentage_changes_pred[:min_length]
-    percentage_changes_true = percentage_changes_true[:min_length]
-    dates = new_data.index[N:N + min_length]
-
-    # Simulator
-    max_risk_amount = initial_aum * risk_tolerance
-    portfolio_value = initial_aum
-    available_balance = initial_aum
-    position_values = []
-    portfolio_values = []
-    trade_dates = []
-    open_positions = []
-
-    for i in range(len(percentage_changes_pred)):
-        position_size = max_risk_amount * abs(percentage_changes_pred[i]) / 100
-        position_direction = np.sign(percentage_changes_pred[i])
-        entry_date = dates[i]
-        exit_date = dates[i + N] if i + N < len(dates) else dates[-1]
-
-        if abs(percentage_changes_pred[i]) > threshold:
-            if position_size > available_balance:
-                position_size = available_balance
-
-            if position_size > 0:
-                open_positions.append({
-                    'size': position_size,
-                    'entry_date': entry_date,
-                    'exit_date': exit_date,
-                    'position_direction': position_direction
-                })
-                available_balance -= position_size
-
-        position_exits = []
-        for position in open_positions:
-            if position['exit_date'] == entry_date:
-                profit_loss = (position['size'] * percentage_changes_true[i - N] / 100 * position['position_direction']) - position['size'] * 0.05  # Includes 5% commission
-                portfolio_value += profit_loss
-                available_balance += position['size'] + profit_loss
-                position_values.append(profit_loss)
-                portfolio_values.append(portfolio_value)
-                trade_dates.append(position['entry_date'])
-                position_exits.append(position)
-
-        for position in position_exits:
-            open_positions.remove(position)
-
-    # Metrics
-    returns = np.array(position_values)
-    mean_return = np.mean(returns) if len(returns) > 0 else 0
-    std_return = np.std(returns) if len(returns) > 0 else 1
-    sharpe_ratio = mean_return / std_return * np.sqrt(12) if std_return != 0 else 0
-    cumulative_returns = np.cumsum(returns)
-    running_max = np.maximum.accumulate(cumulative_returns)
-    drawdown = cumulative_returns - running_max
-    max_drawdown = drawdown.min() if len(drawdown) > 0 else 0
-    years = (dates[-1] - dates[0]).days / 365.25 if len(dates) > 1 else 1
-    cagr = ((portfolio_value / initial_aum) ** (1 / years) - 1) * 100 if years != 0 else 0
-
-    return {
-        'N': N,
-        'Sharpe Ratio': sharpe_ratio,
-        'Max Drawdown': max_drawdown,
-        'Max DD %': (np.abs(max_drawdown) / initial_aum) * 100,
-        'Final Portfolio Value': portfolio_value,
-        'CAGR': cagr,
-        'Portfolio Values': portfolio_values,
-        'Trade Dates': trade_dates
-    }
-
-N_values = range(1, 52)
-results = []
-
-for N in N_values:
-    result = backtest_model(N, weekly_X, new_data)
-    results.append(result)
-    print(f"Tested N = {N}")
-
-results_df = pd.DataFrame(results)
-
-optimal_N = results_df.loc[results_df['Sharpe Ratio'].idxmax()]['N']
-print(f"Optimal N: {optimal_N}")
-
-fig, ax1 = plt.subplots(figsize=(10, 6))
-
-color = 'tab:blue'
-ax1.set_xlabel('N')
-ax1.set_ylabel('Sharpe Ratio', color=color)
-ax1.plot(results_df['N'], results_df['Sharpe Ratio'], label='Sharpe Ratio', color=color)
-ax1.tick_params(axis='y', labelcolor=color)
-ax1.legend(loc='upper left')
-
-ax2 = ax1.twinx()
-color = 'tab:green'
-ax2.set_ylabel('CAGR (%)', color=color)
-ax2.plot(results_df['N'], results_df['CAGR'], label='CAGR', color=color)
-ax2.tick_params(axis='y', labelcolor=color)
-ax2.legend(loc='lower right')
-
-ax3 = ax1.twinx()
-color = 'tab:red'
-ax3.spines['right'].set_position(('outward', 60))
-ax3.set_ylabel('Max Drawdown %', color=color)
-ax3.plot(results_df['N'], results_df['Max DD %'], label='Max Drawdown %', color=color)
-ax3.tick_params(axis='y', labelcolor=color)
-ax3.legend(loc='upper right')
-
-plt.axvline(x=optimal_N, color='gray', linestyle='--', linewidth=1, label=f'Optimal N = {optimal_N}')
-plt.text(optimal_N, max(results_df['Sharpe Ratio']), f'N = {optimal_N}', color='gray', ha='center')
-
-fig.tight_layout()
-plt.title('Key Metrics vs N')
-plt.grid(True)
-plt.legend()
-plt.show()
-
-final_result = backtest_model(optimal_N, weekly_X, new_data)
-
-plt.figure(figsize=(10, 6))
-plt.plot(final_result['Trade Dates'], final_result['Portfolio Values'], marker='o')
-plt.xlabel('Date')
-plt.ylabel('Portfolio Value')
-plt.title(f'Portfolio Value Over Time (Optimal N = {optimal_N})')
-plt.grid(True)
-plt.show()
\ No newline at end of file
+
+from ngforecast import instrumentation, plots
+from ngforecast.config import DATASET_PATH, MODEL_FILE_PATH, PARAMS_FILE_PATH, SCHEMA_PATH, TEST_DATA_PATH
+from ngforecast.session import BacktestSession
+
+CACHE_PATH = 'NG_new/.backtest_cache.sqlite'  # Metric rows keyed by model, data and parameters
+
+
+def backtest_model(N, session, initial_aum=1000000, risk_tolerance=0.75, threshold=15):
+    return session.backtest(N, initial_aum, risk_tolerance, threshold)
+
+
+def find_optimal_N(session, N_values=range(1, 52), initial_aum=1000000, risk_tolerance=0.75, threshold=15,
+                   cache_path=CACHE_PATH):
+    """Sweep every N; returns the results table and the N with the best Sharpe ratio."""
+    results_df = pd.DataFrame(session.sweep(N_values, initial_aum, risk_tolerance, threshold,
+                                            cache_path=cache_path))
+    optimal_N = int(results_df.loc[results_df['Sharpe Ratio'].idxmax()]['N'])
+    return results_df, optimal_N
+
+
+def run(session, N_values=range(1, 52), initial_aum=1000000, risk_tolerance=0.75, threshold=15,
+        output_dir=None, show=False, cache_path=CACHE_PATH):
+    """One configuration: sweep, report, backtest the optimal N and plot both."""
+    results_df, optimal_N = find_optimal_N(session, N_values, initial_aum, risk_tolerance, threshold, cache_path)
+    for N in results_df['N']:
+        print(f"Tested N = {N}")
+    print(f"Optimal N: {optimal_N}")
+
+    final_result = backtest_model(optimal_N, session, initial_aum, risk_tolerance, threshold)
+
+    paths = {'sweep': None, 'portfolio': None}
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        name = f'risk{risk_tolerance:g}_threshold{threshold:g}'
+        results_df.to_csv(os.path.join(output_dir, f'sweep_{name}.csv'), index=False)
+        paths = {kind: os.path.join(output_dir, f'{kind}_{name}.png') for kind in paths}
+    if output_dir or show:
+        with instrumentation.stage('plot'):
+            plots.plot_sweep(results_df, optimal_N, paths['sweep'], show)
+            plots.plot_portfolio(final_result['Trade Dates'], final_result['Portfolio Values'],
+                                 f'Portfolio Value Over Time (Optimal N = {optimal_N})', paths['portfolio'], show)
+
+    return {'Results': results_df, 'Optimal N': optimal_N, 'Final Result': final_result}
+
+
+def run_walk_forward(session, N_values=range(1, 52), lookback=260, step=1, initial_aum=1000000,
+                     risk_tolerance=0.75, threshold=15, output_dir=None, show=False):
+    """One configuration traded walk-forward: report the N history and plot the out-of-sample equity."""
+    result = session.walk_forward(N_values, lookback, step, initial_aum, risk_tolerance, threshold)
+    n_history = result['N History']
+    equity_curve = result['Equity Curve']
+    for date, N in zip(n_history['DATE'], n_history['N']):
+        print(f"{date.strftime('%Y-%m-%d')}: N = {N}")
+    print(f"Out-of-sample Sharpe Ratio: {result['Sharpe Ratio']}")
+    print(f"Out-of-sample CAGR: {result['CAGR']}")
+    if len(equity_curve):
+        print(f"Final Portfolio Value: {equity_curve['Portfolio Value'].iloc[-1]}")
+
+    path = None
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        name = f'risk{risk_tolerance:g}_threshold{threshold:g}'
+        n_history.to_csv(os.path.join(output_dir, f'walk_forward_N_{name}.csv'), index=False)
+        equity_curve.to_csv(os.path.join(output_dir, f'walk_forward_equity_{name}.csv'), index_label='DATE')
+        path = os.path.join(output_dir, f'walk_forward_{name}.png')
+    if output_dir or show:
+        with instrumentation.stage('plot'):
+            plots.plot_portfolio(equity_curve.index, equity_curve['Portfolio Value'],
+                                 f'Walk-Forward Portfolio Value (lookback {lookback} weeks, step {step})', path, show)
+
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Sweep the holding horizon N and plot the key metrics.')
+    parser.add_argument('--model', default=MODEL_FILE_PATH)
+    parser.add_argument('--params', default=PARAMS_FILE_PATH)
+    parser.add_argument('--data', default=None, help=f'weekly dataset to backtest (default: {TEST_DATA_PATH})')
+    parser.add_argument('--schema', default=SCHEMA_PATH)
+    parser.add_argument('--oof', default=None,
+                        help='sweep NG_dataset.csv on out-of-fold predictions from train.py --cv expanding '
+                             'instead of scoring test.csv with the saved model')
+    parser.add_argument('--max-N', type=int, default=51)
+    parser.add_argument('--initial-aum', type=float, default=1000000)
+    parser.add_argument('--risk-tolerance', type=float, nargs='+', default=[0.75])
+    parser.add_argument('--threshold', type=float, nargs='+', default=[15])
+    parser.add_argument('--walk-forward', action='store_true',
+                        help='re-pick N every --step weeks from the trailing --lookback weeks and trade it out of '
+                             'sample, instead of sweeping the whole period once')
+    parser.add_argument('--lookback', type=int, default=260, help='walk-forward in-sample window in weeks')
+    parser.add_argument('--step', type=int, default=1, help='walk-forward re-optimisation interval in weeks')
+    parser.add_argument('--output-dir', default=None,
+                        help='write figures and result tables here instead of showing them')
+    parser.add_argument('--no-show', action='store_true', help='never open plot windows')
+    parser.add_argument('--no-cache', action='store_true', help=f'neither read nor write {CACHE_PATH}')
+    args = parser.parse_args(argv)
+
+    data_path = args.data or (DATASET_PATH if args.oof else TEST_DATA_PATH)
+    session = BacktestSession(args.model, args.params, data_path, args.schema, args.oof)
+    if not args.oof:
+        print("Loaded Best Parameters:", session.params)
+    show = not (args.output_dir or args.no_show) and plots.display_available()
+
+    runs = {}
+    N_values = range(1, args.max_N + 1)
+    cache_path = None if args.no_cache else CACHE_PATH
+    for risk_tolerance, threshold in itertools.product(args.risk_tolerance, args.threshold):
+        if args.walk_forward:
+            runs[risk_tolerance, threshold] = run_walk_forward(session, N_values, args.lookback, args.step,
+                                                               args.initial_aum, risk_tolerance, threshold,
+                                                               args.output_dir, show)
+        else:
+            runs[risk_tolerance, threshold] = run(session, N_values, args.initial_aum, risk_tolerance, threshold,
+                                                  args.output_dir, show, cache_path)
+    return runs
+
+
+if __name__ == '__main__':
+    main()
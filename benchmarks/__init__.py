@@ -0,0 +1 @@
+"""Performance benchmarks for the preprocessing, training, sweep and simulator stages."""
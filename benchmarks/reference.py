@@ -0,0 +1,147 @@
+"""Original (pre-optimisation) implementations, used as golden references by the benchmarks."""
+
+import numpy as np
+import pandas as pd
+
+
+def calculate_percentage_change(values, N):
+    pct_changes = []
+    for i in range(len(values) - N):
+        pct_change = ((values[i + N] - values[i]) / values[i]) * 100
+        pct_changes.append(pct_change)
+    return pct_changes
+
+
+def simulate(percentage_changes_pred, percentage_changes_true, dates, N, initial_aum=1000000, risk_tolerance=0.75,
+             threshold=15):
+    """The list-of-dicts position loop from test_sim.py / N_finder.backtest_model."""
+    max_risk_amount = initial_aum * risk_tolerance
+    portfolio_value = initial_aum
+    available_balance = initial_aum
+    position_values = []
+    portfolio_values = []
+    trade_dates = []
+    open_positions = []
+
+    for i in range(len(percentage_changes_pred)):
+        position_size = max_risk_amount * abs(percentage_changes_pred[i]) / 100
+        position_direction = np.sign(percentage_changes_pred[i])
+        entry_date = dates[i]
+        exit_date = dates[i + N] if i + N < len(dates) else dates[-1]
+
+        if abs(percentage_changes_pred[i]) > threshold:
+            if position_size > available_balance:
+                position_size = available_balance
+
+            if position_size > 0:
+                open_positions.append({
+                    'size': position_size,
+                    'entry_date': entry_date,
+                    'exit_date': exit_date,
+                    'position_direction': position_direction
+                })
+                available_balance -= position_size
+
+        position_exits = []
+        for position in open_positions:
+            if position['exit_date'] == entry_date:
+                profit_loss = (position['size'] * percentage_changes_true[i - N] / 100 * position['position_direction']) - position['size'] * 0.05
+                portfolio_value += profit_loss
+                available_balance += position['size'] + profit_loss
+                position_values.append(profit_loss)
+                portfolio_values.append(portfolio_value)
+                trade_dates.append(position['entry_date'])
+                position_exits.append(position)
+
+        for position in position_exits:
+            open_positions.remove(position)
+
+    return position_values, portfolio_values, trade_dates, portfolio_value
+
+
+def backtest_model(N, predictions, y_true, index, initial_aum=1000000, risk_tolerance=0.75, threshold=15):
+    """N_finder.backtest_model as it was, with predictions passed in."""
+    percentage_changes_pred = calculate_percentage_change(predictions, N)
+    percentage_changes_true = calculate_percentage_change(y_true, N)
+    min_length = min(len(percentage_changes_pred), len(percentage_changes_true))
+    percentage_changes_pred = percentage_changes_pred[:min_length]
+    percentage_changes_true = percentage_changes_true[:min_length]
+    dates = index[N:N + min_length]
+
+    position_values, portfolio_values, trade_dates, portfolio_value = simulate(
+        percentage_changes_pred, percentage_changes_true, dates, N, initial_aum, risk_tolerance, threshold)
+
+    returns = np.array(position_values)
+    mean_return = np.mean(returns) if len(returns) > 0 else 0
+    std_return = np.std(returns) if len(returns) > 0 else 1
+    sharpe_ratio = mean_return / std_return * np.sqrt(12) if std_return != 0 else 0
+    cumulative_returns = np.cumsum(returns)
+    running_max = np.maximum.accumulate(cumulative_returns)
+    drawdown = cumulative_returns - running_max
+    max_drawdown = drawdown.min() if len(drawdown) > 0 else 0
+    years = (dates[-1] - dates[0]).days / 365.25 if len(dates) > 1 else 1
+    cagr = ((portfolio_value / initial_aum) ** (1 / years) - 1) * 100 if years != 0 else 0
+
+    return {
+        'N': N,
+        'Sharpe Ratio': sharpe_ratio,
+        'Max Drawdown': max_drawdown,
+        'Max DD %': (np.abs(max_drawdown) / initial_aum) * 100,
+        'Final Portfolio Value': portfolio_value,
+        'CAGR': cagr,
+        'Portfolio Values': portfolio_values,
+        'Trade Dates': trade_dates
+    }
+
+
+def preprocess(paths, n_lags=4):
+    """The original NG_new/preprocess.py merge chain and per-(column, lag) insert loop."""
+
+    def preprocess_df(df, date_col, date_format, freq='W-FRI'):
+        df[date_col] = pd.to_datetime(df[date_col], format=date_format)
+        df.set_index(date_col, inplace=True)
+        weekly_dates = pd.date_range(start=df.index.min(), end=df.index.max(), freq=freq)
+        weekly_df = df.reindex(weekly_dates).interpolate(method='linear')
+        weekly_df.reset_index(inplace=True)
+        weekly_df.rename(columns={'index': 'DATE'}, inplace=True)
+        return weekly_df
+
+    ng_df = preprocess_df(pd.read_csv(paths['ng']), 'Week of', '%m/%d/%Y')
+    imports_df = preprocess_df(pd.read_csv(paths['imports']), 'Month', '%b %Y')
+    imports_df.rename(columns={'U.S. Natural Gas Imports MMcf': 'Imports_MMcf'}, inplace=True)
+    exports_df = preprocess_df(pd.read_csv(paths['exports']), 'Month', '%b %Y')
+    exports_df.rename(columns={'U.S. Natural Gas Exports MMcf': 'Exports_MMcf'}, inplace=True)
+
+    combined_df = pd.merge(ng_df, imports_df, on='DATE', how='left')
+    combined_df = pd.merge(combined_df, exports_df, on='DATE', how='left')
+    combined_df.dropna(subset=['Imports_MMcf', 'Exports_MMcf'], inplace=True)
+
+    crude_df = preprocess_df(pd.read_csv(paths['crude']), 'Week of', '%m/%d/%Y')
+    crude_df.rename(columns={'Cushing OK Crude Oil Future Contract 1 $/bbl': 'Crude_Oil_Price'}, inplace=True)
+    final_df = pd.merge(combined_df, crude_df, on='DATE', how='left')
+
+    cpi_df = preprocess_df(pd.read_csv(paths['cpi']), 'DATE', '%Y-%m-%d')
+    cpi_df.rename(columns={'MEDCPIM158SFRBCLE': 'CPI'}, inplace=True)
+    final_df = pd.merge(final_df, cpi_df, on='DATE', how='left')
+
+    storms_df = pd.read_csv(paths['storms'])
+    storms_df['datetime'] = pd.to_datetime(storms_df[['year', 'month', 'day', 'hour']])
+    storms_df.set_index('datetime', inplace=True)
+    weekly_storms_df = storms_df.resample('W-FRI').agg({
+        'wind': 'mean',
+        'pressure': 'mean',
+        'tropicalstorm_force_diameter': 'mean',
+        'hurricane_force_diameter': 'mean'
+    }).reset_index()
+    weekly_storms_df.rename(columns={'datetime': 'DATE'}, inplace=True)
+    final_df = pd.merge(final_df, weekly_storms_df, on='DATE', how='left')
+
+    columns_to_lag = ['Natural Gas Futures Contract 1 $/MMBTU', 'Crude_Oil_Price', 'Imports_MMcf', 'Exports_MMcf', 'CPI']
+    for column in columns_to_lag:
+        for lag in range(1, n_lags + 1):
+            final_df[f'{column}_Lag_{lag}'] = final_df[column].shift(lag)
+
+    for col in final_df.columns:
+        if final_df[col].dtype == 'object':
+            final_df[col] = final_df[col].str.replace(',', '').astype(float)
+    return final_df
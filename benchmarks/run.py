@@ -0,0 +1,332 @@
+"""Benchmark runner: times each stage on synthetic data, tracks peak memory and checks outputs.
+
+    python -m benchmarks.run                                  # every stage at 1x and 10x
+    python -m benchmarks.run --scales 1x 10x 100x daily --stages simulate sweep
+    python -m benchmarks.run --save-baseline                  # store timings and output digests
+    python -m benchmarks.run --save-digests                   # store output digests only
+
+Every stage output is checked against the original implementation in
+``benchmarks/reference.py`` (for sizes up to ``--reference-max-rows``) and, when a
+baseline exists, against the stored digest; timings and peak memory are compared with
+the baseline using ``--tolerance``. The exit status is 1 on any regression or mismatch.
+
+The committed ``benchmarks/baselines.json`` holds only the output digests, which do not
+depend on the machine; save timings to a local file with ``--baseline my.json --save-baseline``.
+"""
+
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import reference
+from benchmarks.synthetic import SCALES, TARGET, StubModel, append_week, feature_matrix, source_csvs
+from ngforecast.simulator import run_simulation
+from ngforecast.sweep import horizon_changes, percentage_change_matrix, sweep_N
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+BENCH_N = 37
+
+
+class Skip(Exception):
+    pass
+
+
+class Stage:
+    """``run`` is timed; ``prepare`` (untimed) resets state before each run; ``check`` validates the output."""
+
+    def __init__(self, run, check=None, digest=None, prepare=None):
+        self.run = run
+        self.check = check
+        self.digest = digest
+        self.prepare = prepare
+
+
+def digest(*arrays):
+    sha = hashlib.sha1()
+    for array in arrays:
+        sha.update(np.round(np.asarray(array, dtype=np.float64), 6).tobytes())
+    return sha.hexdigest()[:16]
+
+
+def load_preprocess_module():
+    spec = importlib.util.spec_from_file_location('ng_new_preprocess', os.path.join(ROOT, 'NG_new', 'preprocess.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def frame_digest(df):
+    # Nanoseconds, so the digest does not depend on the resolution pandas parsed the dates at
+    return digest(df.select_dtypes('number').to_numpy(), df['DATE'].dt.as_unit('ns').astype('int64'))
+
+
+def preprocess_stage(scale, workdir, options):
+    module = load_preprocess_module()
+    paths = source_csvs(os.path.join(workdir, 'sources'), scale)
+
+    module.SOURCES = [dict(spec, path=paths[spec['name']]) for spec in module.SOURCES]
+
+    def run():
+        return module.build_dataset()
+
+    def check(output):
+        if SCALES[scale]['rows'] > options.reference_max_rows:
+            return 'reference skipped'
+        pd.testing.assert_frame_equal(output, reference.preprocess(paths))
+        return 'matches original preprocess'
+
+    return Stage(run, check, frame_digest)
+
+
+def preprocess_incremental_stage(scale, workdir, options):
+    module = load_preprocess_module()
+    paths = source_csvs(os.path.join(workdir, 'sources'), scale)
+    module.SOURCES = [dict(spec, path=paths[spec['name']]) for spec in module.SOURCES]
+    cache_dir = os.path.join(workdir, 'cache')
+    snapshot = os.path.join(workdir, 'cache-snapshot')
+    module.build_dataset_incremental(cache_dir)
+    shutil.copytree(cache_dir, snapshot)
+    append_week(paths)
+
+    def prepare():
+        shutil.rmtree(cache_dir)
+        shutil.copytree(snapshot, cache_dir)
+
+    def run():
+        return module.build_dataset_incremental(cache_dir)[0]
+
+    def check(output):
+        pd.testing.assert_frame_equal(output, module.build_dataset())
+        return 'matches full rebuild'
+
+    return Stage(run, check, frame_digest, prepare)
+
+
+def train_stage(scale, workdir, options):
+    try:
+        import catboost  # noqa: F401
+    except ImportError:
+        raise Skip('catboost is not installed')
+    from ngforecast.tuning import successive_halving
+
+    data = feature_matrix(scale)
+    X, y = data.drop(columns=[TARGET]), data[TARGET]
+    param_grid = {'depth': [4, 6], 'learning_rate': [0.03, 0.1], 'l2_leaf_reg': [3], 'border_count': [32]}
+
+    def run():
+        return successive_halving(X, y, param_grid, n_candidates=4, min_iterations=20, max_iterations=180,
+                                  verbose=False)
+
+    return Stage(run, digest=lambda output: digest([output[1]]))
+
+
+def _horizon_inputs(scale):
+    data = feature_matrix(scale)
+    features = [col for col in data.columns if col not in [TARGET]]
+    return data, data[features], data[TARGET].to_numpy()
+
+
+def simulate_stage(scale, workdir, options):
+    data, X, y_true = _horizon_inputs(scale)
+    predictions = StubModel().predict(X)
+    pred_changes = horizon_changes(percentage_change_matrix(predictions, [BENCH_N]), 0, BENCH_N)
+    true_changes = horizon_changes(percentage_change_matrix(y_true, [BENCH_N]), 0, BENCH_N)
+
+    def run():
+        return run_simulation(pred_changes, true_changes, BENCH_N)
+
+    def check(output):
+        if len(data) > options.reference_max_rows:
+            return 'reference skipped'
+        started = time.perf_counter()
+        position_values, portfolio_values, _, portfolio_value = reference.simulate(
+            list(pred_changes), list(true_changes), data.index[BENCH_N:], BENCH_N)
+        elapsed = time.perf_counter() - started
+        assert np.array_equal(output['Position Values'], position_values), 'position P&L differs'
+        assert np.array_equal(output['Portfolio Values'], portfolio_values), 'portfolio values differ'
+        assert output['Final Portfolio Value'] == portfolio_value, 'final portfolio value differs'
+        return f'matches original loop ({elapsed:.3f}s)'
+
+    return Stage(run, check, lambda output: digest(output['Position Values'], output['Portfolio Values']))
+
+
+def sweep_stage(scale, workdir, options):
+    data, X, y_true = _horizon_inputs(scale)
+    model = StubModel()
+    N_values = range(1, 52)
+
+    def run():
+        return sweep_N(model.predict(X), y_true, data.index, N_values)
+
+    def check(output):
+        if len(data) > options.reference_max_rows:
+            return 'reference skipped'
+        started = time.perf_counter()
+        expected = [reference.backtest_model(N, model.predict(X), y_true, data.index) for N in N_values]
+        elapsed = time.perf_counter() - started
+        for result, original in zip(output, expected):
+            assert result['Final Portfolio Value'] == original['Final Portfolio Value'], f"N = {result['N']} differs"
+            for metric in ('Sharpe Ratio', 'Max Drawdown', 'CAGR'):
+                assert np.isclose(result[metric], original[metric], rtol=1e-9, atol=1e-9, equal_nan=True), \
+                    f"{metric} for N = {result['N']} differs"
+        return f'matches original sweep ({elapsed:.3f}s)'
+
+    def sweep_digest(output):
+        return digest([[result['Final Portfolio Value'], result['Sharpe Ratio']] for result in output])
+
+    return Stage(run, check, sweep_digest)
+
+
+def search_stage(scale, workdir, options):
+    from ngforecast.search import pareto_front, parameter_search
+
+    data, X, y_true = _horizon_inputs(scale)
+    predictions = StubModel().predict(X)
+    param_grid = {'N': list(range(1, 52)), 'risk_tolerance': [0.5, 0.75], 'threshold': [10, 15]}
+
+    def run():
+        return parameter_search(predictions, y_true, data.index, param_grid, n_jobs=2, verbose=False)
+
+    def check(output):
+        front = pareto_front(output)
+        assert not front.empty, 'empty Pareto front'
+        # A wiped-out configuration (NaN CAGR) that is worse on every other objective is dominated
+        worst = output.iloc[[0]].assign(**{'Sharpe Ratio': output['Sharpe Ratio'].min() - 1, 'CAGR': np.nan,
+                                           'Max DD %': output['Max DD %'].max() + 1})
+        with_nan = pd.concat([output, worst], ignore_index=True)
+        assert len(with_nan) - 1 not in pareto_front(with_nan).index, 'NaN-CAGR row is on the Pareto front'
+        return f'{len(front)} Pareto-optimal of {len(output)}'
+
+    def search_digest(output):
+        rows = output[['N', 'Risk Tolerance', 'Threshold', 'Final Portfolio Value', 'Sharpe Ratio']].to_numpy()
+        return digest(rows[np.lexsort(rows[:, ::-1].T)])
+
+    return Stage(run, check, search_digest)
+
+
+STAGES = {
+    'preprocess': preprocess_stage,
+    'preprocess-incremental': preprocess_incremental_stage,
+    'train': train_stage,
+    'simulate': simulate_stage,
+    'sweep': sweep_stage,
+    'search': search_stage,
+}
+
+
+def measure(stage, repeat):
+    """Best wall time over ``repeat`` runs, then peak traced memory (MB) of one more run."""
+    best = float('inf')
+    output = None
+    for _ in range(repeat):
+        if stage.prepare:
+            stage.prepare()
+        started = time.perf_counter()
+        output = stage.run()
+        best = min(best, time.perf_counter() - started)
+
+    if stage.prepare:
+        stage.prepare()
+    tracemalloc.start()
+    try:
+        stage.run()
+        peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+    return output, best, peak
+
+
+def compare(record, baseline, tolerance):
+    """Notes on how ``record`` differs from its baseline, and whether that is a regression."""
+    if baseline is None:
+        return ['no baseline'], False
+    notes, regressed = [], False
+    if 'seconds' not in baseline:
+        pass
+    elif record['seconds'] > baseline['seconds'] * (1 + tolerance):
+        notes.append(f"SLOWER x{record['seconds'] / baseline['seconds']:.2f}")
+        regressed = True
+    elif record['seconds'] < baseline['seconds'] * (1 - tolerance):
+        notes.append(f"faster x{baseline['seconds'] / record['seconds']:.2f}")
+    if 'peak_mb' in baseline and record['peak_mb'] > baseline['peak_mb'] * (1 + tolerance) + 1:
+        notes.append(f"MORE MEMORY {record['peak_mb']:.1f}MB vs {baseline['peak_mb']:.1f}MB")
+        regressed = True
+    if baseline.get('digest') and record.get('digest') and record['digest'] != baseline['digest']:
+        notes.append('OUTPUT CHANGED')
+        regressed = True
+    return notes, regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the performance benchmarks on synthetic data.')
+    parser.add_argument('--scales', nargs='+', default=['1x', '10x'], choices=list(SCALES))
+    parser.add_argument('--stages', nargs='+', default=list(STAGES), choices=list(STAGES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative slowdown / memory growth')
+    parser.add_argument('--reference-max-rows', type=int, default=20000,
+                        help='largest size at which the original implementations are run for comparison')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--save-digests', action='store_true',
+                        help='store only the machine-independent output digests in the baseline')
+    options = parser.parse_args(argv)
+
+    baselines = {}
+    if os.path.exists(options.baseline):
+        with open(options.baseline, 'r') as f:
+            baselines = json.load(f)
+
+    failed = False
+    records = {}
+    print(f"{'stage':<24}{'scale':<8}{'seconds':>10}{'peak MB':>10}  notes")
+    for stage_name in options.stages:
+        for scale in options.scales:
+            key = f'{stage_name}/{scale}'
+            with tempfile.TemporaryDirectory() as workdir:
+                try:
+                    stage = STAGES[stage_name](scale, workdir, options)
+                except Skip as reason:
+                    print(f"{stage_name:<24}{scale:<8}{'-':>10}{'-':>10}  skipped: {reason}")
+                    continue
+
+                output, seconds, peak = measure(stage, options.repeat)
+                record = {'seconds': seconds, 'peak_mb': peak}
+                notes = []
+                if stage.digest:
+                    record['digest'] = stage.digest(output)
+                if stage.check:
+                    try:
+                        notes.append(stage.check(output))
+                    except AssertionError as error:
+                        notes.append(f'CHECK FAILED: {error}')
+                        failed = True
+
+            comparison, regressed = compare(record, baselines.get(key), options.tolerance)
+            failed = failed or regressed
+            records[key] = record
+            print(f"{stage_name:<24}{scale:<8}{seconds:>10.4f}{peak:>10.1f}  {'; '.join(notes + comparison)}")
+
+    if options.save_digests:
+        records = {key: {'digest': record['digest']} for key, record in records.items() if 'digest' in record}
+    if options.save_baseline or options.save_digests:
+        baselines.update(records)
+        with open(options.baseline, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"Saved baseline to {options.baseline}")
+        return 0
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""Deterministic synthetic source CSVs, feature matrices and a stub model for the benchmarks."""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+TARGET = 'Natural Gas Futures Contract 1 $/MMBTU'
+
+# Rows of the feature matrix / price series per scale. 100x uses a daily calendar so that
+# its ~430 years stay inside the nanosecond Timestamp range.
+SCALES = {
+    '1x': {'rows': 1560, 'freq': 'W-FRI'},
+    '10x': {'rows': 15600, 'freq': 'W-FRI'},
+    '100x': {'rows': 156000, 'freq': 'D'},
+    'daily': {'rows': 10957, 'freq': 'D'},
+}
+
+START = '1720-01-05'
+
+
+def dates_for(scale):
+    spec = SCALES[scale]
+    return pd.date_range(start=START, periods=spec['rows'], freq=spec['freq'])
+
+
+def price_path(rows, rng, start=3.0, volatility=0.03):
+    """Positive random-walk price series."""
+    return start * np.exp(np.cumsum(rng.normal(0, volatility, rows)))
+
+
+def feature_matrix(scale, n_noise=20, n_lags=4, seed=0):
+    """Frame shaped like test.csv: DATE index, target, lagged target and noise features."""
+    rng = np.random.default_rng(seed)
+    index = dates_for(scale)
+    prices = price_path(len(index), rng)
+    data = {TARGET: prices}
+    for lag in range(1, n_lags + 1):
+        data[f'{TARGET}_Lag_{lag}'] = np.concatenate([np.full(lag, prices[0]), prices[:-lag]])
+    for k in range(n_noise):
+        data[f'Feature_{k}'] = rng.normal(0, 1, len(index))
+    return pd.DataFrame(data, index=pd.DatetimeIndex(index, name='DATE'))
+
+
+class StubModel:
+    """Stands in for the CatBoost model: a fixed blend of the lag features plus a noise tilt."""
+
+    def predict(self, X):
+        values = np.asarray(X, dtype=np.float64)
+        lag_1, lag_2 = values[:, 0], values[:, 1]
+        return (0.6 * lag_1 + 0.4 * lag_2) * (1 + 0.1 * np.tanh(values[:, -1]))
+
+
+def _monthly(index):
+    return pd.date_range(start=index[0] - pd.offsets.MonthBegin(1), end=index[-1], freq='MS')
+
+
+def source_csvs(directory, scale, seed=0):
+    """Write NG_new-format source CSVs covering the scale's date range; returns {source: path}."""
+    rng = np.random.default_rng(seed)
+    os.makedirs(directory, exist_ok=True)
+    index = dates_for(scale)
+    months = _monthly(index)
+    paths = {name: os.path.join(directory, file) for name, file in [
+        ('ng', 'NG1.csv'), ('imports', 'imports.csv'), ('exports', 'exports.csv'),
+        ('crude', 'crude_oil.csv'), ('cpi', 'CPI.csv'), ('storms', 'storms.csv')]}
+
+    # Weekly/daily price files are newest first, like the EIA downloads
+    pd.DataFrame({'Week of': index.strftime('%m/%d/%Y'), TARGET: price_path(len(index), rng).round(3)}) \
+        .iloc[::-1].to_csv(paths['ng'], index=False)
+    pd.DataFrame({'Week of': index.strftime('%m/%d/%Y'),
+                  'Cushing OK Crude Oil Future Contract 1 $/bbl': price_path(len(index), rng, 60).round(2)}) \
+        .iloc[::-1].to_csv(paths['crude'], index=False)
+    pd.DataFrame({'Month': months.strftime('%b %Y'),
+                  'U.S. Natural Gas Imports MMcf': rng.integers(150000, 400000, len(months))}) \
+        .iloc[::-1].to_csv(paths['imports'], index=False)
+    pd.DataFrame({'Month': months.strftime('%b %Y'),
+                  'U.S. Natural Gas Exports MMcf': rng.integers(5000, 700000, len(months))}) \
+        .iloc[::-1].to_csv(paths['exports'], index=False)
+    pd.DataFrame({'DATE': months.strftime('%Y-%m-%d'), 'MEDCPIM158SFRBCLE': rng.normal(3, 1, len(months))}) \
+        .to_csv(paths['cpi'], index=False)
+
+    # Storm track points: six-hourly observations in bursts during the season
+    n_storms = max(int((index[-1] - index[0]).days / 365.25 * 12), 1)
+    starts = index[0] + pd.to_timedelta(rng.integers(0, (index[-1] - index[0]).days, n_storms), unit='D')
+    times = (starts.values[:, None] + np.arange(20) * np.timedelta64(6, 'h')).ravel()
+    times = pd.DatetimeIndex(np.sort(times))
+    n = len(times)
+    pd.DataFrame({
+        'year': times.year, 'month': times.month, 'day': times.day, 'hour': times.hour,
+        'lat': rng.uniform(10, 40, n).round(1), 'long': rng.uniform(-95, -60, n).round(1),
+        'status': 'tropical storm', 'category': 'NA',
+        'wind': rng.integers(25, 150, n), 'pressure': rng.integers(900, 1015, n),
+        'tropicalstorm_force_diameter': rng.integers(0, 600, n).astype(float),
+        'hurricane_force_diameter': rng.integers(0, 200, n).astype(float),
+    }).to_csv(paths['storms'], index=False)
+    return paths
+
+
+def append_week(paths, rng=None):
+    """Add one more week of price data to the NG1 and crude files (prepended: newest first)."""
+    rng = rng or np.random.default_rng(1)
+    for name in ('ng', 'crude'):
+        df = pd.read_csv(paths[name])
+        last = pd.to_datetime(df['Week of'], format='%m/%d/%Y').max()
+        row = pd.DataFrame({'Week of': [(last + pd.Timedelta(weeks=1)).strftime('%m/%d/%Y')],
+                            df.columns[1]: [round(float(df.iloc[0, 1]) * (1 + rng.normal(0, 0.03)), 3)]})
+        pd.concat([row, df], ignore_index=True).to_csv(paths[name], index=False)
@@ -0,0 +1 @@
+"""Shared forecasting, simulation and data utilities for the NG scripts."""
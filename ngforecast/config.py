@@ -0,0 +1,8 @@
+"""Default paths and column names shared by the scripts and services."""
+
+MODEL_FILE_PATH = 'NG_new/catboost_ng_model.bin'
+PARAMS_FILE_PATH = 'NG_new/best_params.json'
+DATASET_PATH = 'NG_new/NG_dataset.csv'
+TEST_DATA_PATH = 'NG_new/test.csv'
+SCHEMA_PATH = 'NG_new/dataset_schema.json'
+TARGET = 'Natural Gas Futures Contract 1 $/MMBTU'
@@ -0,0 +1,162 @@
+"""Time-ordered expanding-window cross-validation with an on-disk fold cache.
+
+Fold ``k`` trains on every week before its test block and is scored on the block, so
+no fold sees the future. Each fitted fold model and its out-of-fold predictions are
+cached under a key of (parameters, fold row range, data hash): repeating a search, or
+refitting the winning parameters to collect their out-of-fold predictions, reuses the
+folds that were already trained. The out-of-fold predictions cover every test block
+and can be fed to the N sweep as leak-free model outputs.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from ngforecast import instrumentation
+from ngforecast.result_cache import frame_hash
+from ngforecast.tuning import sample_candidates, thread_budget
+
+
+def expanding_folds(n_rows, n_splits=3, gap=0):
+    """``(train_end, test_start, test_end)`` row ranges, oldest first.
+
+    The test blocks tile the last ``n_splits / (n_splits + 1)`` of the rows, as in
+    scikit-learn's ``TimeSeriesSplit``; ``gap`` rows before each block are kept out
+    of its training window.
+    """
+    test_size = n_rows // (n_splits + 1)
+    if test_size == 0:
+        raise ValueError(f"{n_rows} rows are too few for {n_splits} expanding-window folds")
+    folds = []
+    for k in range(n_splits):
+        test_start = n_rows - (n_splits - k) * test_size
+        folds.append((test_start - gap, test_start, test_start + test_size))
+    return folds
+
+
+def data_hash(X, y):
+    return hashlib.sha1((frame_hash(X) + frame_hash(y.to_frame())).encode()).hexdigest()
+
+
+class FoldCache:
+    """Fold models (``<key>.cbm``) and their out-of-fold predictions (``<key>.npz``) in a directory."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(params, fold, data_key, random_state):
+        payload = json.dumps({'params': params, 'fold': list(fold), 'data': data_key, 'seed': random_state},
+                             sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def load(self, key):
+        path = os.path.join(self.directory, f'{key}.npz')
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as entry:
+            return {'predictions': entry['predictions'], 'mae': float(entry['mae'])}
+
+    def save(self, key, model, predictions, mae):
+        model.save_model(os.path.join(self.directory, f'{key}.cbm'))
+        # Predictions last and renamed into place: an entry is complete once it is visible
+        tmp_path = os.path.join(self.directory, f'{key}.tmp-{os.getpid()}-{id(model)}.npz')
+        np.savez(tmp_path, predictions=predictions, mae=mae)
+        os.replace(tmp_path, os.path.join(self.directory, f'{key}.npz'))
+
+    def load_model(self, key):
+        import catboost as cb
+
+        model = cb.CatBoostRegressor()
+        model.load_model(os.path.join(self.directory, f'{key}.cbm'))
+        return model
+
+
+def _fit_fold(params, fold, X, y, thread_count, random_state, cache, key):
+    import catboost as cb
+
+    if cache is not None:
+        entry = cache.load(key)
+        if entry is not None:
+            instrumentation.count('cached folds')
+            return entry
+
+    train_end, test_start, test_end = fold
+    with instrumentation.stage('fit fold', train_rows=train_end):
+        model = cb.CatBoostRegressor(**params, loss_function='MAE', thread_count=thread_count,
+                                     random_seed=random_state, verbose=0)
+        model.fit(X.iloc[:train_end], y.iloc[:train_end])
+    predictions = np.asarray(instrumentation.predict(model, X.iloc[test_start:test_end]), dtype=np.float64)
+    mae = float(np.mean(np.abs(predictions - y.iloc[test_start:test_end].to_numpy())))
+    if cache is not None:
+        cache.save(key, model, predictions, mae)
+    return {'predictions': predictions, 'mae': mae}
+
+
+def _evaluate(candidates, X, y, folds, cache_dir, n_threads, fold_workers, random_state):
+    """Fit every (candidate, fold) pair in one thread pool; returns per-candidate fold results."""
+    fold_workers, thread_count = thread_budget(n_threads, fold_workers)
+    cache = FoldCache(cache_dir) if cache_dir else None
+    data_key = data_hash(X, y) if cache is not None else None
+
+    with ThreadPoolExecutor(max_workers=fold_workers) as pool:
+        futures = [[pool.submit(_fit_fold, params, fold, X, y, thread_count, random_state, cache,
+                                FoldCache.key(params, fold, data_key, random_state) if cache is not None else None)
+                    for fold in folds]
+                   for params in candidates]
+        return [[future.result() for future in row] for row in futures]
+
+
+def _summarise(params, folds, fold_results, index):
+    oof = np.full(len(index), np.nan)
+    for (_, test_start, test_end), entry in zip(folds, fold_results):
+        oof[test_start:test_end] = entry['predictions']
+    fold_mae = [entry['mae'] for entry in fold_results]
+    return {
+        'params': params,
+        'mae': float(np.mean(fold_mae)),
+        'fold_mae': fold_mae,
+        'oof': pd.Series(oof, index=index, name='Prediction').iloc[folds[0][1]:],
+    }
+
+
+def cross_validate(X, y, params, n_splits=3, gap=0, cache_dir=None, n_threads=None, fold_workers=None,
+                   random_state=42):
+    """Expanding-window CV of one parameter set: mean and per-fold MAE plus the out-of-fold predictions."""
+    folds = expanding_folds(len(X), n_splits, gap)
+    fold_results = _evaluate([params], X, y, folds, cache_dir, n_threads, fold_workers, random_state)[0]
+    return _summarise(params, folds, fold_results, X.index)
+
+
+def cv_search(X, y, param_grid, n_candidates=50, n_splits=3, gap=0, cache_dir=None, n_threads=None,
+              fold_workers=None, random_state=42, verbose=True):
+    """Random search scored by expanding-window CV MAE; the leak-free counterpart of RandomizedSearchCV.
+
+    All candidate folds share one pool of ``fold_workers`` threads, each fitting with its
+    share of ``n_threads``. Returns ``(best_params, best_mae, results)`` with the results
+    sorted best first.
+    """
+    candidates = sample_candidates(param_grid, n_candidates, random_state, exclude=())
+    folds = expanding_folds(len(X), n_splits, gap)
+    evaluated = _evaluate(candidates, X, y, folds, cache_dir, n_threads, fold_workers, random_state)
+    results = sorted((_summarise(params, folds, fold_results, X.index)
+                      for params, fold_results in zip(candidates, evaluated)), key=lambda result: result['mae'])
+    if verbose:
+        print(f"Cross-validated {len(candidates)} candidates on {len(folds)} expanding folds, "
+              f"best MAE {results[0]['mae']}")
+    return results[0]['params'], results[0]['mae'], results
+
+
+def write_oof_predictions(path, predictions):
+    """Write out-of-fold predictions (a Series indexed by DATE) for ``N_finder.py --oof``."""
+    predictions.dropna().rename('Prediction').rename_axis('DATE').to_frame().to_csv(path)
+
+
+def read_oof_predictions(path):
+    predictions = pd.read_csv(path, parse_dates=['DATE'], index_col='DATE')
+    return predictions['Prediction']
@@ -0,0 +1,199 @@
+"""Memory-mapped columnar copies of the weekly datasets.
+
+A store is a directory next to the CSV (``NG_dataset.csv`` -> ``NG_dataset.store/``)
+holding an int64 date column, one Fortran-ordered value matrix per dtype (so each
+column is contiguous; float32 features and the float64 target under a dataset schema)
+and a small ``schema.json``. Loading maps the files read-only, so every process that
+opens the same store shares the page cache instead of its own copy.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: publishing still skips stores another process already built
+    fcntl = None
+
+from ngforecast import instrumentation
+from ngforecast.schema import apply_schema, check_columns, dtypes as schema_dtypes
+
+SCHEMA_FILE = 'schema.json'
+DATES_FILE = 'dates.npy'
+DATE_UNIT = 'ns'
+VALUES_FILE = 'values_{}.npy'
+LOAD_ATTEMPTS = 5
+
+
+def store_path(csv_path):
+    return os.path.splitext(csv_path)[0] + '.store'
+
+
+def source_stat(csv_path):
+    stat = os.stat(csv_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+@contextmanager
+def _publish_lock(path):
+    """Exclusive lock on ``<path>.lock`` while a store is swapped into place."""
+    with open(f'{path}.lock', 'a') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def write_store(df, path, date_column='DATE', dtype=np.float64, source=None, dtypes=None):
+    """Write ``df`` (DATE column or DatetimeIndex plus numeric columns) as a store at ``path``.
+
+    Columns are stored as ``dtypes[column]`` (default ``dtype``), one matrix per dtype.
+    The store is built in a private directory and published under a lock; if another
+    process published a store of the same ``source`` meanwhile, that one is kept.
+    """
+    if date_column in df.columns:
+        df = df.set_index(date_column)
+    # Fixed unit: pandas 3 parses CSV dates at second or microsecond resolution
+    dates = pd.DatetimeIndex(df.index).as_unit(DATE_UNIT).asi8.astype(np.int64)
+    columns = [str(column) for column in df.columns]
+    blocks = {}
+    for column in columns:
+        blocks.setdefault(np.dtype((dtypes or {}).get(column, dtype)).name, []).append(column)
+
+    tmp_path = f'{path}.tmp-{os.getpid()}-{threading.get_ident()}'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, DATES_FILE), dates)
+    for block_dtype, block_columns in blocks.items():
+        values = np.asfortranarray(df[block_columns].to_numpy(dtype=block_dtype))
+        np.save(os.path.join(tmp_path, VALUES_FILE.format(block_dtype)), values)
+    schema = {
+        'rows': len(df),
+        'date_column': date_column,
+        'date_unit': DATE_UNIT,
+        'columns': columns,
+        'blocks': blocks,
+        'source': os.path.abspath(source) if source else None,
+        'source_stat': source_stat(source) if source else None,
+    }
+    with open(os.path.join(tmp_path, SCHEMA_FILE), 'w') as f:
+        json.dump(schema, f, indent=2)
+
+    with _publish_lock(path):
+        if source and is_fresh(path, source, dtypes):
+            shutil.rmtree(tmp_path)
+            return read_schema(path)
+        if os.path.exists(path):
+            # Moved aside rather than deleted in place, so readers never see a half-removed store
+            stale_path = f'{tmp_path}.stale'
+            os.replace(path, stale_path)
+            os.replace(tmp_path, path)
+            shutil.rmtree(stale_path, ignore_errors=True)
+        else:
+            os.replace(tmp_path, path)
+    return schema
+
+
+def read_schema(path):
+    with open(os.path.join(path, SCHEMA_FILE), 'r') as f:
+        return json.load(f)
+
+
+def is_fresh(path, csv_path, dtypes=None):
+    """True if the store at ``path`` was built from the current contents of ``csv_path``.
+
+    With ``dtypes``, the store must also hold every column in its requested dtype.
+    """
+    try:
+        schema = read_schema(path)
+    except FileNotFoundError:
+        return False
+    # Stores without a recorded date unit may hold non-nanosecond dates; rebuild them
+    if 'blocks' not in schema or schema.get('date_unit') != DATE_UNIT:
+        return False
+    if schema.get('source_stat') != source_stat(csv_path):
+        return False
+    if dtypes is None:
+        return True
+    stored = {column: block_dtype for block_dtype, columns in schema['blocks'].items() for column in columns}
+    return all(stored.get(column) == np.dtype(dtype).name for column, dtype in dtypes.items())
+
+
+def open_store(path, mmap=True):
+    """Schema plus the (memory-mapped) date array and ``{dtype: value matrix}`` of a store."""
+    schema = read_schema(path)
+    mmap_mode = 'r' if mmap else None
+    dates = np.load(os.path.join(path, DATES_FILE), mmap_mode=mmap_mode)
+    blocks = {block_dtype: np.load(os.path.join(path, VALUES_FILE.format(block_dtype)), mmap_mode=mmap_mode)
+              for block_dtype in schema['blocks']}
+    return schema, dates, blocks
+
+
+def load_store(path, mmap=True):
+    """Store as a DataFrame indexed by DATE whose columns are views on the mapped files."""
+    schema, dates, blocks = open_store(path, mmap)
+    dates = pd.to_datetime(np.asarray(dates), unit=schema.get('date_unit', DATE_UNIT))
+    index = pd.DatetimeIndex(dates, name=schema['date_column'])
+    # The widest block (the float32 features) backs the frame; the others, e.g. the float64
+    # target, are inserted column by column at their positions
+    main_dtype = max(schema['blocks'], key=lambda block_dtype: len(schema['blocks'][block_dtype]))
+    df = pd.DataFrame(blocks[main_dtype], index=index, columns=schema['blocks'][main_dtype], copy=False)
+    position = {column: k for k, column in enumerate(schema['columns'])}
+    inserts = sorted((position[column], block_dtype, k) for block_dtype, columns in schema['blocks'].items()
+                     if block_dtype != main_dtype for k, column in enumerate(columns))
+    for loc, block_dtype, k in inserts:
+        df.insert(loc, schema['columns'][loc], blocks[block_dtype][:, k])
+    return df
+
+
+def _parse_csv(csv_path, schema, dtypes):
+    with instrumentation.stage('parse csv', path=csv_path):
+        data = pd.read_csv(csv_path, dtype=dtypes)
+        data['DATE'] = pd.to_datetime(data['DATE'])
+        if schema is not None:
+            data = apply_schema(data, schema, csv_path)
+    return data
+
+
+def load_dataset(csv_path, mmap=True, schema=None):
+    """Shared loader for the weekly CSVs (``NG_dataset.csv``, ``test.csv``).
+
+    Returns a DataFrame indexed by DATE. The columnar store next to the CSV is used
+    when it is up to date; otherwise the CSV is parsed once and the store rebuilt.
+    With a dataset ``schema`` the columns are validated against it (``SchemaError``
+    on drift) and stored in the schema dtypes. If the store keeps disappearing
+    under concurrent rebuilds, the parsed CSV is returned instead.
+    """
+    path = store_path(csv_path)
+    dtypes = schema_dtypes(schema) if schema is not None else None
+    parsed = None
+    if not is_fresh(path, csv_path, dtypes):
+        parsed = _parse_csv(csv_path, schema, dtypes)
+        try:
+            write_store(parsed, path, source=csv_path, dtypes=dtypes)
+        except OSError:
+            return parsed.set_index('DATE')
+
+    for attempt in range(LOAD_ATTEMPTS):
+        try:
+            with instrumentation.stage('load store', path=path):
+                data = load_store(path, mmap)
+            break
+        except FileNotFoundError:
+            # Another process is swapping in its copy of the store
+            time.sleep(0.01 * 2 ** attempt)
+    else:
+        data = (parsed if parsed is not None else _parse_csv(csv_path, schema, dtypes)).set_index('DATE')
+    if schema is not None:
+        check_columns(data.columns, schema, csv_path)
+    return data
@@ -0,0 +1,89 @@
+"""Declarative lag / rolling / percentage-change feature engine.
+
+A spec is a dict naming the source columns and the transforms to apply to each:
+
+    {'columns': ['Crude_Oil_Price', 'CPI'], 'lags': range(1, 53), 'rolling_mean': [4, 13],
+     'rolling_std': [13], 'pct_change': [1, 4]}
+
+``build_features`` computes every requested column into one preallocated 2-D array and
+attaches it with a single concat, instead of inserting one Series per (column, lag).
+"""
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+TRANSFORMS = ('lags', 'rolling_mean', 'rolling_std', 'pct_change')
+
+
+def feature_names(specs):
+    """Output column names in the order ``build_features`` produces them."""
+    names = []
+    for spec in specs:
+        for column in spec['columns']:
+            names += [f'{column}_Lag_{lag}' for lag in spec.get('lags', ())]
+            names += [f'{column}_RollMean_{window}' for window in spec.get('rolling_mean', ())]
+            names += [f'{column}_RollStd_{window}' for window in spec.get('rolling_std', ())]
+            names += [f'{column}_PctChange_{periods}' for periods in spec.get('pct_change', ())]
+    return names
+
+
+def lookback(specs):
+    """Rows of history the specs need before the first row they are computed for."""
+    needed = 0
+    for spec in specs:
+        needed = max([needed, *spec.get('lags', ()), *spec.get('pct_change', ())])
+        needed = max([needed, *(window - 1 for window in spec.get('rolling_mean', ())),
+                      *(window - 1 for window in spec.get('rolling_std', ()))])
+    return needed
+
+
+def _lag(values, lag, out):
+    out[:lag] = np.nan
+    out[lag:] = values[:max(len(values) - lag, 0)]
+
+
+def _rolling(values, window, out, reducer):
+    out[:window - 1] = np.nan
+    if len(values) >= window:
+        out[window - 1:] = reducer(sliding_window_view(values, window), axis=1)
+
+
+def _rolling_std(windows, axis):
+    return np.std(windows, axis=axis, ddof=1)
+
+
+def _pct_change(values, periods, out):
+    out[:periods] = np.nan
+    previous = values[:max(len(values) - periods, 0)]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[periods:] = (values[periods:] - previous) / previous * 100
+
+
+def build_features(df, specs):
+    """Return ``df`` with every feature in ``specs`` appended (rolling std uses ddof=1, as pandas)."""
+    names = feature_names(specs)
+    block = np.empty((len(df), len(names)), dtype=np.float64, order='F')
+
+    j = 0
+    for spec in specs:
+        unknown = set(spec) - set(TRANSFORMS) - {'columns'}
+        if unknown:
+            raise ValueError(f"Unknown feature transforms {sorted(unknown)}, expected {TRANSFORMS}.")
+        for column in spec['columns']:
+            values = df[column].to_numpy(dtype=np.float64)
+            for lag in spec.get('lags', ()):
+                _lag(values, lag, block[:, j])
+                j += 1
+            for window in spec.get('rolling_mean', ()):
+                _rolling(values, window, block[:, j], np.mean)
+                j += 1
+            for window in spec.get('rolling_std', ()):
+                _rolling(values, window, block[:, j], _rolling_std)
+                j += 1
+            for periods in spec.get('pct_change', ()):
+                _pct_change(values, periods, block[:, j])
+                j += 1
+
+    features = pd.DataFrame(block, index=df.index, columns=names, copy=False)
+    return pd.concat([df, features], axis=1)
@@ -0,0 +1,140 @@
+"""Run instrumentation: stage timers, counters and JSON / Chrome-trace export.
+
+Disabled by default, in which case ``stage`` returns a shared no-op context and
+``count`` returns after a flag check. Enable it with ``enable(path)`` or by setting
+``NG_TRACE=/path/to/trace.json`` (and ``NG_TRACE_PER_N=1`` for per-N timings) before
+running any script; the trace is written at exit and opens in chrome://tracing or
+Perfetto. Its ``summary`` and ``counters`` keys give per-stage totals and the
+predict / position counters without a viewer.
+"""
+
+import atexit
+import contextlib
+import json
+import os
+import threading
+import time
+
+_enabled = False
+_per_n = False
+_path = None
+_events = []
+_counters = {}
+_lock = threading.Lock()
+_origin_ns = time.perf_counter_ns()
+_noop = contextlib.nullcontext()
+
+
+def enabled():
+    return _enabled
+
+
+def enable(path=None, per_n=False):
+    """Start recording; the trace is written to ``path`` (if given) when the process exits."""
+    global _enabled, _per_n, _path
+    if path and _path is None:
+        atexit.register(_export_at_exit)
+    _enabled, _per_n = True, per_n
+    _path = path or _path
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def reset():
+    with _lock:
+        _events.clear()
+        _counters.clear()
+
+
+class _Stage:
+    __slots__ = ('name', 'args', 'start_ns')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        end_ns = time.perf_counter_ns()
+        event = {
+            'name': self.name,
+            'ph': 'X',
+            'ts': (self.start_ns - _origin_ns) / 1000,
+            'dur': (end_ns - self.start_ns) / 1000,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': self.args,
+        }
+        with _lock:
+            _events.append(event)
+        return False
+
+
+def stage(name, per_n=False, **args):
+    """Context manager timing one stage; ``per_n`` stages are only recorded when per-N timing is on."""
+    if not _enabled or (per_n and not _per_n):
+        return _noop
+    return _Stage(name, args)
+
+
+def count(name, value=1):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def predict(model, X):
+    """``model.predict(X)`` counted as one predict call and ``len(X)`` rows scored."""
+    if not _enabled:
+        return model.predict(X)
+    with stage('predict', rows=len(X)):
+        predictions = model.predict(X)
+    count('predict calls')
+    count('rows scored', len(X))
+    return predictions
+
+
+def summary():
+    totals = {}
+    with _lock:
+        events = list(_events)
+    for event in events:
+        total = totals.setdefault(event['name'], {'calls': 0, 'total_ms': 0.0})
+        total['calls'] += 1
+        total['total_ms'] += event['dur'] / 1000
+    return totals
+
+
+def export(path):
+    """Write the Chrome-trace JSON (trace events plus ``summary`` and ``counters``) to ``path``."""
+    with _lock:
+        events = list(_events)
+        counters = dict(_counters)
+    end_ts = (time.perf_counter_ns() - _origin_ns) / 1000
+    counter_events = [{'name': name, 'ph': 'C', 'ts': end_ts, 'pid': os.getpid(), 'args': {name: value}}
+                      for name, value in counters.items()]
+    trace = {
+        'traceEvents': events + counter_events,
+        'displayTimeUnit': 'ms',
+        'summary': summary(),
+        'counters': counters,
+    }
+    with open(path, 'w') as f:
+        json.dump(trace, f, default=str)
+    return path
+
+
+def _export_at_exit():
+    if _path and (_events or _counters):
+        export(_path)
+
+
+if os.environ.get('NG_TRACE'):
+    enable(os.environ['NG_TRACE'], per_n=os.environ.get('NG_TRACE_PER_N') == '1')
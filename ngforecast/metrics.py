@@ -0,0 +1,95 @@
+"""Streaming metric accumulators for settled trades."""
+
+import heapq
+import math
+
+# Direction of each ranking objective; the others are maximised
+PARETO_OBJECTIVES = {'Sharpe Ratio': 'max', 'CAGR': 'max', 'Max DD %': 'min'}
+
+
+def rank_score(result, rank_by):
+    """``result[rank_by]`` signed so that higher is always better."""
+    return -result[rank_by] if PARETO_OBJECTIVES.get(rank_by) == 'min' else result[rank_by]
+
+
+def years_between(dates):
+    return (dates[-1] - dates[0]).days / 365.25 if len(dates) > 1 else 1
+
+
+class MetricAccumulator:
+    """Sharpe, drawdown, trade count, win rate and CAGR updated as each position settles.
+
+    Sharpe uses Welford's running mean/variance of the settled P&L (population std, as
+    ``np.std``), drawdown is tracked on the cumulative P&L, so memory is constant no
+    matter how many trades are fed in.
+    """
+
+    __slots__ = ('initial_aum', 'portfolio_value', 'trades', 'wins', '_mean', '_m2', '_cumulative', '_peak',
+                 'max_drawdown')
+
+    def __init__(self, initial_aum=1000000):
+        self.initial_aum = initial_aum
+        self.portfolio_value = initial_aum
+        self.trades = 0
+        self.wins = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._cumulative = 0.0
+        self._peak = -math.inf
+        self.max_drawdown = 0.0
+
+    def update(self, profit_loss):
+        self.portfolio_value += profit_loss
+        self.trades += 1
+        if profit_loss > 0:
+            self.wins += 1
+        delta = profit_loss - self._mean
+        self._mean += delta / self.trades
+        self._m2 += delta * (profit_loss - self._mean)
+        self._cumulative += profit_loss
+        if self._cumulative > self._peak:
+            self._peak = self._cumulative
+        if self._cumulative - self._peak < self.max_drawdown:
+            self.max_drawdown = self._cumulative - self._peak
+
+    def metrics(self, years=1):
+        std_return = math.sqrt(self._m2 / self.trades) if self.trades > 0 else 1
+        sharpe_ratio = self._mean / std_return * math.sqrt(12) if std_return != 0 else 0
+        growth = self.portfolio_value / self.initial_aum
+        if years == 0:
+            cagr = 0
+        else:
+            cagr = (growth ** (1 / years) - 1) * 100 if growth >= 0 else math.nan
+
+        return {
+            'Sharpe Ratio': sharpe_ratio,
+            'Max Drawdown': self.max_drawdown,
+            'Max DD %': (abs(self.max_drawdown) / self.initial_aum) * 100,
+            'Final Portfolio Value': self.portfolio_value,
+            'CAGR': cagr,
+            'Trades': self.trades,
+            'Win Rate': self.wins / self.trades if self.trades > 0 else 0,
+        }
+
+
+class TopK:
+    """Keeps the payloads of the ``k`` highest-scoring entries (e.g. equity curves)."""
+
+    def __init__(self, k):
+        self.k = k
+        self._heap = []
+        self._sequence = 0
+
+    def push(self, score, key, payload):
+        if self.k <= 0 or score != score:
+            return
+        entry = (score, -self._sequence, key, payload)
+        self._sequence += 1
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry > self._heap[0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def items(self):
+        """(key, payload) pairs, best first."""
+        return [(key, payload) for _, _, key, payload in sorted(self._heap, reverse=True)]
@@ -0,0 +1,22 @@
+"""Loading the trained CatBoost model and its parameters."""
+
+import json
+import os
+
+
+def load_model(model_file_path, params_file_path=None):
+    """Load the CatBoost regressor (and best parameters, if a path is given)."""
+    import catboost as cb
+
+    if not os.path.exists(model_file_path):
+        raise FileNotFoundError(f"Model file {model_file_path} does not exist.")
+    model = cb.CatBoostRegressor()
+    model.load_model(model_file_path)
+
+    params = None
+    if params_file_path is not None:
+        if not os.path.exists(params_file_path):
+            raise FileNotFoundError(f"Parameters file {params_file_path} does not exist.")
+        with open(params_file_path, 'r') as f:
+            params = json.load(f)
+    return model, params
@@ -0,0 +1,139 @@
+"""Vectorized block-bootstrap Monte Carlo of the test_sim.py trading rules."""
+
+import numpy as np
+import pandas as pd
+
+from ngforecast import instrumentation
+
+METRICS = ['Sharpe Ratio', 'Max Drawdown', 'Max DD %', 'Final Portfolio Value', 'CAGR', 'Trades']
+
+
+def bootstrap_true_changes(percentage_changes_pred, percentage_changes_true, n_paths, block_size, rng):
+    """Synthetic realised changes: predictions plus circular block-bootstrapped residuals, (paths x weeks)."""
+    pred = np.asarray(percentage_changes_pred, dtype=np.float64)
+    residuals = np.asarray(percentage_changes_true, dtype=np.float64) - pred
+    length = len(pred)
+    n_blocks = -(-length // block_size)
+    starts = rng.integers(0, length, size=(n_paths, n_blocks))
+    index = (starts[:, :, None] + np.arange(block_size)) % length
+    return pred + residuals[index.reshape(n_paths, -1)[:, :length]]
+
+
+def _exit_schedule(candidates, N):
+    """Entry weeks settling in each week, in opening order (exit = min(i + N, last week))."""
+    length = len(candidates)
+    schedule = [[] for _ in range(length)]
+    for entry in np.flatnonzero(candidates):
+        schedule[min(entry + N, length - 1)].append(entry)
+    return schedule
+
+
+def simulate_paths(percentage_changes_pred, true_paths, N, initial_aum=1000000, risk_tolerance=0.75, threshold=15,
+                   commission=0.05):
+    """Run the trading rules on every row of ``true_paths`` at once.
+
+    Predictions (and so entry signals) are shared by all paths; balances, position
+    sizes and settlements are tracked as per-path vectors, and metrics are accumulated
+    as positions settle (Welford's mean/variance per path, as ``MetricAccumulator``).
+    Returns a dict of per-path metric arrays.
+    """
+    pred = np.asarray(percentage_changes_pred, dtype=np.float64)
+    n_paths, length = true_paths.shape
+    candidates = np.abs(pred) > threshold
+    raw_sizes = initial_aum * risk_tolerance * np.abs(pred) / 100
+    directions = np.sign(pred)
+    schedule = _exit_schedule(candidates, N)
+
+    sizes = np.zeros((n_paths, length))
+    available_balance = np.full(n_paths, float(initial_aum))
+    portfolio_value = np.full(n_paths, float(initial_aum))
+    trades = np.zeros(n_paths)
+    mean = np.zeros(n_paths)
+    m2 = np.zeros(n_paths)
+    cumulative = np.zeros(n_paths)
+    peak = np.full(n_paths, -np.inf)
+    max_drawdown = np.zeros(n_paths)
+
+    for i in range(length):
+        if candidates[i]:
+            position_size = np.minimum(raw_sizes[i], available_balance)
+            position_size = np.where(position_size > 0, position_size, 0)
+            sizes[:, i] = position_size
+            available_balance -= position_size
+
+        if schedule[i]:
+            realised_change = true_paths[:, i - N]
+            for entry in schedule[i]:
+                position_size = sizes[:, entry]
+                settled = position_size > 0
+                profit_loss = (position_size * realised_change / 100 * directions[entry]) \
+                    - position_size * commission
+                profit_loss = np.where(settled, profit_loss, 0)
+                portfolio_value += profit_loss
+                available_balance += position_size + profit_loss
+                trades += settled
+                delta = profit_loss - mean
+                mean += np.where(settled, delta / np.maximum(trades, 1), 0)
+                m2 += np.where(settled, delta * (profit_loss - mean), 0)
+                cumulative += profit_loss
+                peak = np.where(settled, np.maximum(peak, cumulative), peak)
+                max_drawdown = np.where(settled, np.minimum(max_drawdown, cumulative - peak), max_drawdown)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        std = np.sqrt(m2 / trades)
+        sharpe_ratio = np.where((trades > 0) & (std > 0), mean / std * np.sqrt(12), 0)
+
+    return {
+        'Sharpe Ratio': sharpe_ratio,
+        'Max Drawdown': max_drawdown,
+        'Max DD %': np.abs(max_drawdown) / initial_aum * 100,
+        'Final Portfolio Value': portfolio_value,
+        'Trades': trades,
+    }
+
+
+def bootstrap_backtest(percentage_changes_pred, percentage_changes_true, N, index, n_paths=10000, block_size=None,
+                       initial_aum=1000000, risk_tolerance=0.75, threshold=15, commission=0.05,
+                       memory_budget=256 * 2 ** 20, confidence=0.95, random_state=42):
+    """Distribution of the backtest metrics over ``n_paths`` block-bootstrapped histories.
+
+    Residuals of predicted versus true N-week changes are resampled in blocks of
+    ``block_size`` weeks (default N) and added back to the predictions. Paths are
+    simulated in chunks sized so the per-chunk arrays stay within ``memory_budget``
+    bytes. Returns the per-path metrics and a summary with mean, std and the
+    ``confidence`` interval of each metric.
+    """
+    min_length = min(len(percentage_changes_pred), len(percentage_changes_true))
+    pred = np.asarray(percentage_changes_pred, dtype=np.float64)[:min_length]
+    true = np.asarray(percentage_changes_true, dtype=np.float64)[:min_length]
+    dates = index[N:N + min_length]
+    years = (dates[-1] - dates[0]).days / 365.25 if len(dates) > 1 else 1
+    block_size = max(block_size or N, 1)
+
+    # Bootstrap indices, synthetic changes and position sizes: ~4 float64/int64 arrays per path-week
+    chunk = max(int(memory_budget // (4 * 8 * max(min_length, 1) + 4 * 8 * block_size)), 1)
+    rng = np.random.default_rng(random_state)
+    chunks = []
+    for start in range(0, n_paths, chunk):
+        paths = min(chunk, n_paths - start)
+        with instrumentation.stage('bootstrap chunk', paths=paths):
+            true_paths = bootstrap_true_changes(pred, true, paths, block_size, rng)
+            chunks.append(simulate_paths(pred, true_paths, N, initial_aum, risk_tolerance, threshold, commission))
+
+    per_path = pd.DataFrame({name: np.concatenate([result[name] for result in chunks]) for name in chunks[0]})
+    if years != 0:
+        with np.errstate(invalid='ignore'):
+            per_path['CAGR'] = (np.power(per_path['Final Portfolio Value'] / initial_aum, 1 / years) - 1) * 100
+    else:
+        per_path['CAGR'] = 0
+    per_path = per_path[METRICS]
+
+    tail = (1 - confidence) / 2 * 100
+    summary = pd.DataFrame({
+        'Mean': per_path.mean(),
+        'Std': per_path.std(),
+        f'P{tail:g}': per_path.quantile(tail / 100),
+        'Median': per_path.median(),
+        f'P{100 - tail:g}': per_path.quantile(1 - tail / 100),
+    })
+    return {'Paths': per_path, 'Summary': summary}
@@ -0,0 +1,97 @@
+"""Matplotlib figures for the N_finder and test_sim entry points.
+
+matplotlib is imported on the first figure, not with the module. Figures given a
+``path`` are saved there; they are only shown on screen when ``show`` is true, and
+without it the non-interactive Agg backend is used, so scheduled runs never block.
+"""
+
+import os
+import sys
+
+
+def display_available():
+    """True when an interactive window can be opened."""
+    if sys.platform in ('win32', 'darwin'):
+        return True
+    return bool(os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+
+
+def pyplot(show=False):
+    import matplotlib
+
+    if not show:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _finish(plt, fig, path, show):
+    if path:
+        fig.savefig(path, dpi=120, bbox_inches='tight')
+    if show:
+        plt.show()
+    plt.close(fig)
+
+
+def plot_sweep(results_df, optimal_N, path=None, show=False):
+    """Sharpe ratio, CAGR and max drawdown % against N, with the optimal N marked."""
+    plt = pyplot(show)
+    fig, ax1 = plt.subplots(figsize=(10, 6))
+
+    color = 'tab:blue'
+    ax1.set_xlabel('N')
+    ax1.set_ylabel('Sharpe Ratio', color=color)
+    ax1.plot(results_df['N'], results_df['Sharpe Ratio'], label='Sharpe Ratio', color=color)
+    ax1.tick_params(axis='y', labelcolor=color)
+    ax1.legend(loc='upper left')
+
+    ax2 = ax1.twinx()
+    color = 'tab:green'
+    ax2.set_ylabel('CAGR (%)', color=color)
+    ax2.plot(results_df['N'], results_df['CAGR'], label='CAGR', color=color)
+    ax2.tick_params(axis='y', labelcolor=color)
+    ax2.legend(loc='lower right')
+
+    ax3 = ax1.twinx()
+    color = 'tab:red'
+    ax3.spines['right'].set_position(('outward', 60))
+    ax3.set_ylabel('Max Drawdown %', color=color)
+    ax3.plot(results_df['N'], results_df['Max DD %'], label='Max Drawdown %', color=color)
+    ax3.tick_params(axis='y', labelcolor=color)
+    ax3.legend(loc='upper right')
+
+    plt.axvline(x=optimal_N, color='gray', linestyle='--', linewidth=1, label=f'Optimal N = {optimal_N}')
+    plt.text(optimal_N, max(results_df['Sharpe Ratio']), f'N = {optimal_N}', color='gray', ha='center')
+
+    fig.tight_layout()
+    plt.title('Key Metrics vs N')
+    plt.grid(True)
+    plt.legend()
+    _finish(plt, fig, path, show)
+
+
+def plot_portfolio(dates, portfolio_values, title, path=None, show=False):
+    plt = pyplot(show)
+    fig = plt.figure(figsize=(10, 6))
+    plt.plot(dates, portfolio_values, marker='o')
+    plt.xlabel('Date')
+    plt.ylabel('Portfolio Value')
+    plt.title(title)
+    plt.grid(True)
+    _finish(plt, fig, path, show)
+
+
+def plot_changes(dates, percentage_changes_true, percentage_changes_pred, N, path=None, show=False):
+    """Actual vs predicted N-week percentage changes."""
+    plt = pyplot(show)
+    fig = plt.figure(figsize=(10, 6))
+    plt.plot(dates, percentage_changes_true, label=f'Actual NG Spot Price (percent change, next {N} week(s))',
+             color='blue', marker='o')
+    plt.plot(dates, percentage_changes_pred, label=f'Predicted NG Spot Price (percent change, next {N} week(s))',
+             color='red', marker='x')
+    plt.xlabel('Date')
+    plt.ylabel('NG Spot Price change (%)')
+    plt.title('Actual vs Predicted changes in NG Spot Price')
+    plt.legend()
+    plt.grid(True)
+    _finish(plt, fig, path, show)
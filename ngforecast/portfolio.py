@@ -0,0 +1,202 @@
+"""Batch backtests over a manifest of instruments, combined into one shared-capital portfolio.
+
+A manifest is a JSON file::
+
+    {
+      "initial_aum": 1000000,
+      "instruments": [
+        {"name": "NG front month", "dataset": "NG_new/test.csv", "model": "NG_new/catboost_ng_model.bin",
+         "target": "Natural Gas Futures Contract 1 $/MMBTU", "schema": "NG_new/dataset_schema.json",
+         "N": 37, "risk_tolerance": 0.75, "threshold": 15, "commission": 0.05, "weight": 1}
+      ]
+    }
+
+Instruments are scored and backtested on their own in a process pool; every worker
+loads each model file at most once. The main process then replays all of them on one
+calendar against a single available balance: each instrument sizes positions from its
+weight's share of ``initial_aum`` but draws on (and releases into) the shared balance.
+With one instrument the portfolio trades exactly like ``backtest_arrays``.
+
+Run ``python -m ngforecast.portfolio manifest.json``.
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from ngforecast import instrumentation
+from ngforecast.config import TARGET
+from ngforecast.dataset_store import load_dataset
+from ngforecast.metrics import MetricAccumulator, years_between
+from ngforecast.model import load_model
+from ngforecast.schema import feature_names, read_schema
+from ngforecast.simulator import PositionLedger, backtest_arrays
+from ngforecast.sweep import horizon_changes, percentage_change_matrix
+
+INSTRUMENT_DEFAULTS = {
+    'target': TARGET,
+    'schema': None,
+    'N': 37,
+    'risk_tolerance': 0.75,
+    'threshold': 15,
+    'commission': 0.05,
+    'weight': 1,
+}
+
+# Models loaded by this process, keyed by file path
+_models = {}
+
+
+def read_manifest(path):
+    """Manifest with defaults filled in and relative paths resolved against its directory."""
+    with open(path, 'r') as f:
+        manifest = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    instruments = []
+    for k, instrument in enumerate(manifest['instruments']):
+        instrument = {**INSTRUMENT_DEFAULTS, 'name': f'instrument {k}', **instrument}
+        for key in ('dataset', 'model', 'schema'):
+            if instrument[key] is not None:
+                instrument[key] = os.path.join(base, instrument[key])
+        instruments.append(instrument)
+    return {'initial_aum': manifest.get('initial_aum', 1000000), 'instruments': instruments}
+
+
+def _model(path):
+    if path not in _models:
+        _models[path] = load_model(path)[0]
+    return _models[path]
+
+
+def score_instrument(instrument, sleeve_aum):
+    """Predict one instrument and backtest it on its own; returns the arrays the portfolio replays."""
+    with instrumentation.stage('score instrument', instrument=instrument['name']):
+        schema = read_schema(instrument['schema']) if instrument['schema'] else None
+        data = load_dataset(instrument['dataset'], schema=schema)
+        target = schema['target'] if schema else instrument['target']
+        features = feature_names(schema) if schema else [col for col in data.columns if col != target]
+        predictions = instrumentation.predict(_model(instrument['model']), data[features])
+
+    N = instrument['N']
+    pred = horizon_changes(percentage_change_matrix(predictions, [N]), 0, N)
+    true = horizon_changes(percentage_change_matrix(data[target].to_numpy(), [N]), 0, N)
+    standalone = backtest_arrays(N, pred, true, data.index, sleeve_aum, instrument['risk_tolerance'],
+                                 instrument['threshold'], instrument['commission'], curves=False)
+    return {
+        'pred': pred,
+        'true': true,
+        'dates': data.index[N:N + len(pred)],
+        'standalone': standalone,
+    }
+
+
+def _score(args):
+    return score_instrument(*args)
+
+
+def sleeves(instruments, initial_aum):
+    weights = np.array([instrument['weight'] for instrument in instruments], dtype=np.float64)
+    return (initial_aum * weights / weights.sum()).tolist()
+
+
+def simulate_portfolio(instruments, scored, initial_aum):
+    """Replay every instrument's trading steps in date order against one available balance."""
+    sleeve_aum = sleeves(instruments, initial_aum)
+    ledgers = [PositionLedger(len(item['pred'])) for item in scored]
+    accumulators = [MetricAccumulator(aum) for aum in sleeve_aum]
+    portfolio = MetricAccumulator(initial_aum)
+    available_balance = initial_aum
+
+    # One event per (instrument, step); same-date steps run in manifest order. Nanoseconds
+    # throughout, since instruments parsed by different pandas paths may differ in resolution
+    dates = np.concatenate([item['dates'].as_unit('ns').asi8 for item in scored])
+    owners = np.concatenate([np.full(len(item['dates']), k) for k, item in enumerate(scored)])
+    steps = np.concatenate([np.arange(len(item['dates'])) for item in scored])
+    order = np.lexsort((steps, owners, dates))
+
+    curve_dates = []
+    curve_values = []
+    for k, i in zip(owners[order].tolist(), steps[order].tolist()):
+        instrument, item, ledger = instruments[k], scored[k], ledgers[k]
+        N = instrument['N']
+        change = float(item['pred'][i])
+        if abs(change) > instrument['threshold']:
+            position_size = sleeve_aum[k] * instrument['risk_tolerance'] * abs(change) / 100
+            if position_size > available_balance:
+                position_size = available_balance
+            if position_size > 0:
+                exit_i = min(i + N, len(item['pred']) - 1)
+                # Same settlement change run_simulation books on the exit step
+                ledger.open(position_size, (change > 0) - (change < 0), i, exit_i, item['true'][exit_i - N])
+                available_balance -= position_size
+
+        for slot in ledger.exits(i):
+            size = float(ledger.size[slot])
+            profit_loss = (size * float(ledger.realised_change[slot]) / 100 * float(ledger.direction[slot])) \
+                - size * instrument['commission']
+            available_balance += size + profit_loss
+            accumulators[k].update(profit_loss)
+            portfolio.update(profit_loss)
+            curve_dates.append(item['dates'][i])
+            curve_values.append(portfolio.portfolio_value)
+
+    all_dates = pd.DatetimeIndex(np.sort(dates))
+    rows = [{'Instrument': instrument['name'], 'N': instrument['N'], 'Capital': aum,
+             **accumulator.metrics(years_between(item['dates']))}
+            for instrument, item, aum, accumulator in zip(instruments, scored, sleeve_aum, accumulators)]
+    return {
+        'Portfolio': portfolio.metrics(years_between(all_dates)),
+        'Instruments': pd.DataFrame(rows),
+        'Equity Curve': pd.Series(curve_values, index=pd.DatetimeIndex(curve_dates), name='Portfolio Value'),
+        'Available Balance': available_balance,
+    }
+
+
+def run_manifest(manifest, n_jobs=None):
+    """Score every instrument of ``manifest`` (a dict or a path) in parallel and build the portfolio."""
+    if not isinstance(manifest, dict):
+        manifest = read_manifest(manifest)
+    instruments = manifest['instruments']
+    initial_aum = manifest['initial_aum']
+    tasks = list(zip(instruments, sleeves(instruments, initial_aum)))
+    n_jobs = min(n_jobs or os.cpu_count() or 1, len(tasks))
+
+    if n_jobs <= 1:
+        scored = [score_instrument(*task) for task in tasks]
+    else:
+        # Instruments sharing a model are handed out together, so it is loaded by few workers
+        order = sorted(range(len(tasks)), key=lambda k: instruments[k]['model'])
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            results = pool.map(_score, [tasks[k] for k in order], chunksize=max(len(tasks) // (n_jobs * 2), 1))
+            scored = [None] * len(tasks)
+            for k, result in zip(order, results):
+                scored[k] = result
+
+    with instrumentation.stage('portfolio'):
+        result = simulate_portfolio(instruments, scored, initial_aum)
+    standalone = pd.DataFrame([{'Instrument': instrument['name'], **item['standalone']}
+                               for instrument, item in zip(instruments, scored)])
+    result['Standalone'] = standalone
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtest every instrument of a manifest as one portfolio.')
+    parser.add_argument('manifest')
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes (default: one per core)')
+    parser.add_argument('--output', default=None, help='write per-instrument metrics to this CSV')
+    args = parser.parse_args()
+
+    result = run_manifest(args.manifest, args.jobs)
+    print(result['Instruments'].to_string(index=False))
+    print("Portfolio:", result['Portfolio'])
+    if args.output:
+        result['Instruments'].to_csv(args.output, index=False)
+
+
+if __name__ == '__main__':
+    main()
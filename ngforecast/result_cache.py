@@ -0,0 +1,129 @@
+"""Persistent backtest result cache.
+
+Metric rows are stored in SQLite keyed by the model file hash, the dataset hash and the full
+parameter tuple (N, risk tolerance, threshold, initial AUM, commission). ``sweep_N`` looks up
+every point before simulating it and writes each new row as soon as it is computed, so
+repeated or extended sweeps only simulate missing points and an interrupted sweep resumes
+where it stopped. Least recently used rows are evicted once ``max_entries`` is exceeded.
+
+Rows live in a table named after ``SIMULATOR_VERSION``; when the backtest semantics change
+and the version is bumped, rows of older versions are dropped instead of being served.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+from ngforecast.simulator import SIMULATOR_VERSION
+
+TABLE = f'results_v{SIMULATOR_VERSION}'
+_SCHEMA = f'''
+CREATE TABLE IF NOT EXISTS {TABLE} (
+    model_hash TEXT NOT NULL,
+    data_hash TEXT NOT NULL,
+    N INTEGER NOT NULL,
+    risk_tolerance REAL NOT NULL,
+    threshold REAL NOT NULL,
+    initial_aum REAL NOT NULL,
+    commission REAL NOT NULL,
+    metrics TEXT NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (model_hash, data_hash, N, risk_tolerance, threshold, initial_aum, commission)
+)'''
+
+
+def file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def frame_hash(df):
+    """Hash of a frame's values, index and column names."""
+    digest = hashlib.sha1(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    digest.update(json.dumps([str(col) for col in df.columns]).encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Backtest metrics for one (model, dataset) pair, stored in a shared SQLite file."""
+
+    def __init__(self, path, model_hash, data_hash, max_entries=100000):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.model_hash = model_hash
+        self.data_hash = data_hash
+        self.max_entries = max_entries
+        self._connection = sqlite3.connect(path)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        stale = self._connection.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name LIKE 'results%' AND name != ?",
+            (TABLE,)).fetchall()
+        for (name,) in stale:
+            self._connection.execute(f'DROP TABLE IF EXISTS "{name}"')
+        self._connection.execute(_SCHEMA)
+        self._connection.execute(f'CREATE INDEX IF NOT EXISTS {TABLE}_last_used ON {TABLE} (last_used)')
+        self._connection.commit()
+
+    @classmethod
+    def for_files(cls, path, model_file_path, data, max_entries=100000):
+        return cls(path, file_hash(model_file_path), frame_hash(data), max_entries)
+
+    def _key(self, N, risk_tolerance, threshold, initial_aum, commission):
+        return (self.model_hash, self.data_hash, int(N), float(risk_tolerance), float(threshold),
+                float(initial_aum), float(commission))
+
+    def get(self, N, risk_tolerance, threshold, initial_aum, commission):
+        """Cached metric row (with ``N``) or None."""
+        key = self._key(N, risk_tolerance, threshold, initial_aum, commission)
+        row = self._connection.execute(
+            f'SELECT metrics FROM {TABLE} WHERE model_hash=? AND data_hash=? AND N=? AND risk_tolerance=? '
+            'AND threshold=? AND initial_aum=? AND commission=?', key).fetchone()
+        if row is None:
+            return None
+        with self._connection:
+            self._connection.execute(
+                f'UPDATE {TABLE} SET last_used=? WHERE model_hash=? AND data_hash=? AND N=? AND risk_tolerance=? '
+                'AND threshold=? AND initial_aum=? AND commission=?', (time.time(),) + key)
+        return {'N': N, **json.loads(row[0])}
+
+    def put(self, result, risk_tolerance, threshold, initial_aum, commission):
+        """Store a metric row; curves (list values) are not cached."""
+        metrics = {name: value for name, value in result.items() if name != 'N' and not isinstance(value, list)}
+        key = self._key(result['N'], risk_tolerance, threshold, initial_aum, commission)
+        with self._connection:
+            self._connection.execute(f'INSERT OR REPLACE INTO {TABLE} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                     key + (json.dumps(metrics, default=float), time.time()))
+
+    def __len__(self):
+        return self._connection.execute(f'SELECT COUNT(*) FROM {TABLE}').fetchone()[0]
+
+    def evict(self):
+        """Drop the least recently used rows beyond ``max_entries``; returns how many were removed."""
+        excess = len(self) - self.max_entries
+        if excess <= 0:
+            return 0
+        with self._connection:
+            self._connection.execute(
+                f'DELETE FROM {TABLE} WHERE rowid IN (SELECT rowid FROM {TABLE} ORDER BY last_used LIMIT ?)',
+                (excess,))
+        return excess
+
+    def close(self):
+        self.evict()
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
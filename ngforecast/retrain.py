@@ -0,0 +1,43 @@
+"""Warm-start retraining of the CatBoost model on newly appended weeks."""
+
+import json
+import os
+
+import numpy as np
+
+
+def read_train_state(path):
+    """Last trained DATE and reference MAE written by train.py, or None before the first run."""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def write_train_state(path, last_date, mae):
+    with open(path, 'w') as f:
+        json.dump({'last_date': str(last_date), 'mae': float(mae)}, f)
+
+
+def warm_start_retrain(model, params, X_new, y_new, X_recent, y_recent, reference_mae, drift_threshold=1.5,
+                       iterations=100, thread_count=-1):
+    """Continue boosting ``model`` on the recent window if it still predicts the new weeks well.
+
+    The current model is first scored on the new rows it has never seen. If that MAE
+    exceeds ``drift_threshold`` times ``reference_mae`` the update is refused and
+    ``(None, mae)`` returned, so the caller can fall back to a full search. Otherwise
+    ``iterations`` more trees are fitted on ``X_recent`` (the trailing window, which
+    includes the new rows) starting from the current model, and ``(updated_model, mae)``
+    is returned.
+    """
+    import catboost as cb
+
+    mae = float(np.mean(np.abs(model.predict(X_new) - np.asarray(y_new))))
+    if mae > drift_threshold * reference_mae:
+        return None, mae
+
+    boosting_params = {name: value for name, value in params.items() if name != 'iterations'}
+    updated = cb.CatBoostRegressor(**boosting_params, iterations=iterations, loss_function='MAE',
+                                   thread_count=thread_count, verbose=0)
+    updated.fit(X_recent, y_recent, init_model=model)
+    return updated, mae
@@ -0,0 +1,120 @@
+"""Typed dataset schema shared by preprocessing, training and inference.
+
+``NG_new/preprocess.py`` writes ``dataset_schema.json`` next to the dataset: column
+order, dtype, unit and NaN policy for every column. Features are float32 (CatBoost
+quantises borders in float32, so predictions are unchanged) and the target stays
+float64 for the backtest arithmetic. ``load_dataset(..., schema=...)`` casts the CSV to
+these dtypes and rejects files whose columns drifted from the schema.
+"""
+
+import json
+import re
+
+SCHEMA_VERSION = 1
+FEATURE_DTYPE = 'float32'
+TARGET_DTYPE = 'float64'
+_DERIVED = re.compile(r'^(?P<base>.+)_(?P<kind>Lag|RollMean|RollStd|PctChange)_\d+$')
+
+
+class SchemaError(ValueError):
+    """A dataset does not match its schema."""
+
+
+def unit_of(column, units):
+    """Unit of ``column``; derived features inherit their base column's unit."""
+    match = _DERIVED.match(column)
+    if match is None:
+        return units.get(column)
+    if match['kind'] == 'PctChange':
+        return '%'
+    return unit_of(match['base'], units)
+
+
+def nan_policy(column, declared):
+    """Declared NaN policy of ``column``, or None if it has to be observed.
+
+    Derived features always allow NaN: their first rows have no history.
+    """
+    if column in declared:
+        return declared[column]
+    if _DERIVED.match(column):
+        return 'allow'
+    return None
+
+
+def infer_schema(df, target, units=None, nan=None, date_column='DATE'):
+    """Schema for a preprocessed frame: float32 features, float64 target.
+
+    ``nan`` declares the NaN policy (``'allow'`` or ``'forbid'``) per column; undeclared
+    source columns allow NaN only if ``df`` has some, so the declaration should cover
+    every column whose edges can be missing in a rebuild.
+    """
+    units = units or {}
+    declared = nan or {}
+    columns = []
+    for column in df.columns:
+        if column == date_column:
+            continue
+        policy = nan_policy(column, declared)
+        if policy is None:
+            policy = 'allow' if df[column].isna().any() else 'forbid'
+        columns.append({
+            'name': column,
+            'dtype': TARGET_DTYPE if column == target else FEATURE_DTYPE,
+            'unit': unit_of(column, units),
+            'nan': policy,
+        })
+    return {'version': SCHEMA_VERSION, 'date_column': date_column, 'target': target, 'columns': columns}
+
+
+def write_schema(schema, path):
+    with open(path, 'w') as f:
+        json.dump(schema, f, indent=2)
+
+
+def read_schema(path):
+    with open(path, 'r') as f:
+        schema = json.load(f)
+    if schema.get('version') != SCHEMA_VERSION:
+        raise SchemaError(f"{path}: schema version {schema.get('version')} is not {SCHEMA_VERSION}")
+    return schema
+
+
+def column_names(schema):
+    return [column['name'] for column in schema['columns']]
+
+
+def feature_names(schema):
+    return [column['name'] for column in schema['columns'] if column['name'] != schema['target']]
+
+
+def dtypes(schema):
+    return {column['name']: column['dtype'] for column in schema['columns']}
+
+
+def check_columns(columns, schema, source='dataset'):
+    """Raise ``SchemaError`` describing missing, unexpected or reordered columns."""
+    columns = [str(column) for column in columns if column != schema['date_column']]
+    expected = column_names(schema)
+    if columns == expected:
+        return
+    missing = [column for column in expected if column not in columns]
+    unexpected = [column for column in columns if column not in expected]
+    if missing or unexpected:
+        raise SchemaError(f'{source}: columns drifted from the schema (missing {missing}, unexpected {unexpected})')
+    raise SchemaError(f'{source}: columns are in a different order than the schema')
+
+
+def validate(df, schema, source='dataset'):
+    """Check column names, order and the NaN policy of ``df`` against ``schema``."""
+    check_columns(df.columns, schema, source)
+    forbidden = [column['name'] for column in schema['columns'] if column['nan'] == 'forbid']
+    with_nan = [column for column in forbidden if df[column].isna().any()]
+    if with_nan:
+        raise SchemaError(f'{source}: NaN in columns that forbid it: {with_nan}')
+
+
+def apply_schema(df, schema, source='dataset'):
+    """Validate ``df`` and cast every column to its schema dtype (one block per dtype)."""
+    validate(df, schema, source)
+    return df.astype(dtypes(schema), copy=False)
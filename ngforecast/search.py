@@ -0,0 +1,174 @@
+"""Parallel grid/random search over N, risk tolerance, threshold and commission."""
+
+import itertools
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from ngforecast import instrumentation
+from ngforecast.metrics import PARETO_OBJECTIVES, TopK, rank_score
+from ngforecast.simulator import backtest_arrays
+from ngforecast.sweep import horizon_changes, percentage_change_matrix
+
+DEFAULT_GRID = {
+    'N': list(range(1, 52)),
+    'risk_tolerance': [0.25, 0.5, 0.75, 1.0],
+    'threshold': [5, 10, 15, 20, 25],
+    'commission': [0.05],
+}
+
+# Per-process view of the shared prediction arrays, filled by _init_worker
+_worker = {}
+
+
+def _share_array(array):
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+
+def _attach_array(spec):
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    array.flags.writeable = False
+    return shm, array
+
+
+def _set_worker(pred_matrix, true_matrix, horizons, index, initial_aum, shms=()):
+    _worker.update({
+        'shms': shms,
+        'pred': pred_matrix,
+        'true': true_matrix,
+        'rows': {N: row for row, N in enumerate(horizons)},
+        'index': index,
+        'initial_aum': initial_aum,
+    })
+
+
+def _init_worker(pred_spec, true_spec, horizons, index, initial_aum):
+    pred_shm, pred_matrix = _attach_array(pred_spec)
+    true_shm, true_matrix = _attach_array(true_spec)
+    _set_worker(pred_matrix, true_matrix, horizons, index, initial_aum, (pred_shm, true_shm))
+
+
+def _evaluate(params):
+    N, risk_tolerance, threshold, commission = params
+    row = _worker['rows'][N]
+    result = backtest_arrays(N, horizon_changes(_worker['pred'], row, N), horizon_changes(_worker['true'], row, N),
+                             _worker['index'], _worker['initial_aum'], risk_tolerance, threshold, commission,
+                             curves=False)
+    result.pop('N')
+
+    return {
+        'N': N,
+        'Risk Tolerance': risk_tolerance,
+        'Threshold': threshold,
+        'Commission': commission,
+        **result,
+    }
+
+
+def _collect(evaluated, total, verbose, top, rank_by):
+    results = []
+    report_every = max(total // 20, 1)
+    for count, result in enumerate(evaluated, start=1):
+        # Only the position is kept; the few winning curves are rebuilt afterwards
+        top.push(rank_score(result, rank_by), count - 1, None)
+        results.append(result)
+        if verbose and (count % report_every == 0 or count == total):
+            print(f"Evaluated {count}/{total} combinations")
+    return results
+
+
+def parameter_combinations(param_grid=None, n_samples=None, random_state=42):
+    """All (N, risk_tolerance, threshold, commission) tuples of the grid, or a random subset."""
+    grid = {**DEFAULT_GRID, **(param_grid or {})}
+    combinations = list(itertools.product(grid['N'], grid['risk_tolerance'], grid['threshold'],
+                                          grid['commission']))
+    if n_samples is not None and n_samples < len(combinations):
+        combinations = random.Random(random_state).sample(combinations, n_samples)
+    return combinations
+
+
+def parameter_search(predictions, y_true, index, param_grid=None, n_samples=None, initial_aum=1000000,
+                     n_jobs=None, rank_by='Sharpe Ratio', random_state=42, verbose=True, keep_curves=0):
+    """Evaluate the strategy over a parameter grid across a process pool.
+
+    Predicted and true percentage changes for every N in the grid are computed once
+    and placed in shared memory, so workers read them without copying. Returns the
+    metrics of every combination ranked by ``rank_by`` (best first). Workers return
+    metrics only; equity curves are re-simulated afterwards for the ``keep_curves``
+    best, so their cost does not grow with the grid size.
+    """
+    combinations = parameter_combinations(param_grid, n_samples, random_state)
+    horizons = sorted({params[0] for params in combinations})
+    with instrumentation.stage('percentage changes', horizons=len(horizons)):
+        pred_matrix = percentage_change_matrix(predictions, horizons)
+        true_matrix = percentage_change_matrix(y_true, horizons)
+    instrumentation.count('parameter combinations', len(combinations))
+    n_jobs = n_jobs or os.cpu_count() or 1
+    top = TopK(keep_curves)
+
+    if n_jobs == 1:
+        _set_worker(pred_matrix, true_matrix, horizons, index, initial_aum)
+        try:
+            results = _collect(map(_evaluate, combinations), len(combinations), verbose, top, rank_by)
+        finally:
+            _worker.clear()
+    else:
+        pred_shm, pred_spec = _share_array(pred_matrix)
+        true_shm, true_spec = _share_array(true_matrix)
+        try:
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                     initargs=(pred_spec, true_spec, horizons, index, initial_aum)) as pool:
+                chunksize = max(len(combinations) // (n_jobs * 8), 1)
+                results = _collect(pool.map(_evaluate, combinations, chunksize=chunksize),
+                                   len(combinations), verbose, top, rank_by)
+        finally:
+            for shm in (pred_shm, true_shm):
+                shm.close()
+                shm.unlink()
+
+    rows = {N: row for row, N in enumerate(horizons)}
+    for position, _ in top.items():
+        result = results[position]
+        N = result['N']
+        curve = backtest_arrays(N, horizon_changes(pred_matrix, rows[N], N), horizon_changes(true_matrix, rows[N], N),
+                                index, initial_aum, result['Risk Tolerance'], result['Threshold'], result['Commission'],
+                                curves=True)
+        result.update({'Portfolio Values': curve['Portfolio Values'], 'Trade Dates': curve['Trade Dates']})
+    results_df = pd.DataFrame(results)
+    if results_df.empty:
+        return results_df
+    ascending = PARETO_OBJECTIVES.get(rank_by) == 'min'
+    return results_df.sort_values(rank_by, ascending=ascending, ignore_index=True)
+
+
+def pareto_front(results_df, objectives=None):
+    """Rows of ``results_df`` not dominated on the given objectives ({column: 'max' | 'min'}).
+
+    A NaN objective (e.g. the CAGR of a wiped-out portfolio) counts as the worst value.
+    """
+    objectives = objectives or PARETO_OBJECTIVES
+    if results_df.empty:
+        return results_df
+    scores = np.column_stack([
+        results_df[column].to_numpy(dtype=np.float64) * (1 if goal == 'max' else -1)
+        for column, goal in objectives.items()
+    ])
+    scores[np.isnan(scores)] = -np.inf
+
+    dominated = np.zeros(len(scores), dtype=bool)
+    for i in range(len(scores)):
+        if dominated[i]:
+            continue
+        at_least = np.all(scores >= scores[i], axis=1)
+        better = np.any(scores > scores[i], axis=1)
+        dominated[i] = np.any(at_least & better)
+
+    return results_df[~dominated]
@@ -0,0 +1,213 @@
+"""Warm scoring and backtest service.
+
+Loads the model and the dataset once and answers JSON requests over localhost HTTP:
+
+    python -m ngforecast.server --port 8765
+    curl -d '{"op": "backtest", "N": 37, "risk_tolerance": 0.75, "threshold": 15}' localhost:8765
+
+Supported ops are ``predict``, ``backtest`` and ``sweep``; posting a JSON list runs
+every request in it against the same cached predictions. Concurrent ``predict``
+calls with explicit feature rows are coalesced into one model call, and the model
+is reloaded when its file changes on disk.
+"""
+
+import argparse
+import json
+import os
+import queue
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from ngforecast import instrumentation
+from ngforecast.config import MODEL_FILE_PATH, PARAMS_FILE_PATH, SCHEMA_PATH, TARGET, TEST_DATA_PATH
+from ngforecast.dataset_store import load_dataset
+from ngforecast.model import load_model
+from ngforecast.schema import read_schema
+from ngforecast.simulator import backtest_arrays
+from ngforecast.sweep import horizon_changes, percentage_change_matrix, sweep_N
+
+
+def _jsonable(value):
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return _jsonable(value.tolist())
+    if isinstance(value, np.generic):
+        return value.item()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+class _PredictBatcher:
+    """Coalesces concurrent predict calls into a single ``model.predict``."""
+
+    def __init__(self, service, max_wait=0.002):
+        self.service = service
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def predict(self, rows):
+        done = threading.Event()
+        slot = {'rows': np.asarray(rows, dtype=np.float64), 'done': done}
+        self._queue.put(slot)
+        done.wait()
+        if 'error' in slot:
+            raise slot['error']
+        return slot['result']
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while True:
+                    batch.append(self._queue.get(timeout=self.max_wait))
+            except queue.Empty:
+                pass
+
+            try:
+                rows = np.vstack([np.atleast_2d(slot['rows']) for slot in batch])
+                predictions = instrumentation.predict(self.service.model, rows)
+                start = 0
+                for slot in batch:
+                    count = len(np.atleast_2d(slot['rows']))
+                    slot['result'] = predictions[start:start + count]
+                    start += count
+            except Exception as error:
+                for slot in batch:
+                    slot['error'] = error
+            for slot in batch:
+                slot['done'].set()
+
+
+class ScoringService:
+    """Model, dataset and prediction caches kept resident between requests."""
+
+    def __init__(self, model_file_path=MODEL_FILE_PATH, params_file_path=PARAMS_FILE_PATH,
+                 data_path=TEST_DATA_PATH, target=TARGET, schema_path=SCHEMA_PATH):
+        self.model_file_path = model_file_path
+        self.params_file_path = params_file_path
+        self.target = target
+        self.data = load_dataset(data_path, schema=read_schema(schema_path) if schema_path else None)
+        self.features = [col for col in self.data.columns if col not in [target]]
+        self.y_true = self.data[target].to_numpy()
+        self._lock = threading.RLock()
+        self._model_stat = None
+        self.reload_if_changed()
+        self.batcher = _PredictBatcher(self)
+
+    def reload_if_changed(self):
+        """Reload the model (and drop every cache) if its file changed since the last load."""
+        stat = os.stat(self.model_file_path)
+        stat = (stat.st_size, stat.st_mtime_ns)
+        if stat == self._model_stat:
+            return False
+        with self._lock:
+            if stat == self._model_stat:
+                return False
+            self.model, self.params = load_model(self.model_file_path, self.params_file_path)
+            self._predictions = instrumentation.predict(self.model, self.data[self.features])
+            self._changes = {}
+            self._model_stat = stat
+        print("Loaded model", self.model_file_path)
+        return True
+
+    def _horizon(self, N):
+        with self._lock:
+            if N not in self._changes:
+                pred_matrix = percentage_change_matrix(self._predictions, [N])
+                true_matrix = percentage_change_matrix(self.y_true, [N])
+                self._changes[N] = (horizon_changes(pred_matrix, 0, N), horizon_changes(true_matrix, 0, N))
+            return self._changes[N]
+
+    def predict(self, rows=None):
+        if rows is None:
+            return {'DATE': list(self.data.index), 'Prediction': self._predictions}
+        return {'Prediction': self.batcher.predict(rows)}
+
+    def backtest(self, N, risk_tolerance=0.75, threshold=15, initial_aum=1000000, commission=0.05, curves=True):
+        percentage_changes_pred, percentage_changes_true = self._horizon(int(N))
+        return backtest_arrays(int(N), percentage_changes_pred, percentage_changes_true, self.data.index,
+                               initial_aum, risk_tolerance, threshold, commission, curves)
+
+    def sweep(self, N_values=None, risk_tolerance=0.75, threshold=15, initial_aum=1000000, commission=0.05):
+        N_values = N_values or list(range(1, 52))
+        return sweep_N(self._predictions, self.y_true, self.data.index, N_values, initial_aum,
+                       risk_tolerance, threshold, commission)
+
+    def handle(self, request):
+        """Dispatch one request dict ({'op': ..., **params}) or a list of them."""
+        if isinstance(request, list):
+            self.reload_if_changed()
+            return [self._dispatch(dict(item)) for item in request]
+        self.reload_if_changed()
+        return self._dispatch(dict(request))
+
+    def _dispatch(self, request):
+        op = request.pop('op', None)
+        if op == 'predict':
+            return self.predict(**request)
+        if op == 'backtest':
+            return self.backtest(**request)
+        if op == 'sweep':
+            return self.sweep(**request)
+        raise ValueError(f"Unknown op {op!r}, expected 'predict', 'backtest' or 'sweep'.")
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                request = json.loads(self.rfile.read(length) or b'{}')
+                body, status = _jsonable(service.handle(request)), 200
+            except (TypeError, ValueError, KeyError) as error:
+                body, status = {'error': str(error)}, 400
+            except Exception as error:
+                body, status = {'error': repr(error)}, 500
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(host='127.0.0.1', port=8765, **service_kwargs):
+    service = ScoringService(**service_kwargs)
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"Serving on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def request(payload, host='127.0.0.1', port=8765, timeout=60):
+    """Small client: POST ``payload`` to a running service and return the decoded reply."""
+    data = json.dumps(payload).encode()
+    req = urllib.request.Request(f'http://{host}:{port}/', data=data, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Warm scoring and backtest service.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--model', default=MODEL_FILE_PATH)
+    parser.add_argument('--params', default=PARAMS_FILE_PATH)
+    parser.add_argument('--data', default=TEST_DATA_PATH)
+    args = parser.parse_args()
+    serve(args.host, args.port, model_file_path=args.model, params_file_path=args.params, data_path=args.data)
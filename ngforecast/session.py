@@ -0,0 +1,119 @@
+"""Lazily loaded model, dataset and predictions shared by the N_finder and test_sim entry points."""
+
+from functools import cached_property
+
+from ngforecast import instrumentation
+from ngforecast.config import MODEL_FILE_PATH, PARAMS_FILE_PATH, SCHEMA_PATH, TARGET, TEST_DATA_PATH
+from ngforecast.cross_validation import read_oof_predictions
+from ngforecast.dataset_store import load_dataset
+from ngforecast.model import load_model
+from ngforecast.result_cache import ResultCache, file_hash, frame_hash
+from ngforecast.schema import read_schema
+from ngforecast.simulator import backtest_arrays, run_simulation
+from ngforecast.sweep import horizon_changes, percentage_change_matrix, sweep_N
+from ngforecast.walk_forward import walk_forward
+
+
+class BacktestSession:
+    """Model, dataset and predictions, each loaded on first use and then kept.
+
+    Creating a session reads nothing, so importing and configuring the scripts is cheap.
+    Every sweep or simulation run through the same session shares one model load, one
+    dataset load and one predict call, whatever parameters it uses. With
+    ``predictions_path`` (out-of-fold predictions from ``train.py --cv expanding``) the
+    model is never loaded and the dataset is cut to the predicted weeks.
+    """
+
+    def __init__(self, model_file_path=MODEL_FILE_PATH, params_file_path=PARAMS_FILE_PATH,
+                 data_path=TEST_DATA_PATH, schema_path=SCHEMA_PATH, predictions_path=None):
+        self.model_file_path = model_file_path
+        self.params_file_path = params_file_path
+        self.data_path = data_path
+        self.schema_path = schema_path
+        self.predictions_path = predictions_path
+        self._changes = {}
+
+    @cached_property
+    def _loaded(self):
+        return load_model(self.model_file_path, self.params_file_path)
+
+    @property
+    def model(self):
+        return self._loaded[0]
+
+    @property
+    def params(self):
+        return self._loaded[1]
+
+    @cached_property
+    def schema(self):
+        return read_schema(self.schema_path) if self.schema_path else None
+
+    @cached_property
+    def _oof(self):
+        return read_oof_predictions(self.predictions_path)
+
+    @cached_property
+    def data(self):
+        # Validated against the training schema, so column drift fails here rather than in predict
+        data = load_dataset(self.data_path, schema=self.schema)
+        return data.loc[self._oof.index] if self.predictions_path else data
+
+    @property
+    def target(self):
+        return self.schema['target'] if self.schema else TARGET
+
+    @cached_property
+    def features(self):
+        return [col for col in self.data.columns if col != self.target]
+
+    @cached_property
+    def y_true(self):
+        return self.data[self.target].to_numpy()
+
+    @cached_property
+    def predictions(self):
+        if self.predictions_path:
+            return self._oof.to_numpy()
+        return instrumentation.predict(self.model, self.data[self.features])
+
+    def result_cache(self, path):
+        """``ResultCache`` keyed by the model (or prediction file) and this dataset."""
+        source = self.predictions_path or self.model_file_path
+        return ResultCache(path, file_hash(source), frame_hash(self.data))
+
+    def changes(self, N):
+        """Predicted and true N-week percentage changes, computed once per N."""
+        if N not in self._changes:
+            self._changes[N] = tuple(horizon_changes(percentage_change_matrix(values, [N]), 0, N)
+                                     for values in (self.predictions, self.y_true))
+        return self._changes[N]
+
+    def sweep(self, N_values=range(1, 52), initial_aum=1000000, risk_tolerance=0.75, threshold=15,
+              commission=0.05, cache_path=None):
+        with instrumentation.stage('sweep', horizons=len(N_values)):
+            if cache_path is None:
+                return sweep_N(self.predictions, self.y_true, self.data.index, N_values, initial_aum,
+                               risk_tolerance, threshold, commission)
+            with self.result_cache(cache_path) as cache:
+                return sweep_N(self.predictions, self.y_true, self.data.index, N_values, initial_aum,
+                               risk_tolerance, threshold, commission, cache=cache)
+
+    def backtest(self, N, initial_aum=1000000, risk_tolerance=0.75, threshold=15, commission=0.05, curves=True):
+        pred, true = self.changes(N)
+        return backtest_arrays(N, pred, true, self.data.index, initial_aum, risk_tolerance, threshold,
+                               commission, curves)
+
+    def simulate(self, N, initial_aum=1000000, risk_tolerance=0.75, threshold=15, commission=0.05):
+        """``run_simulation`` output plus the trading dates of every step."""
+        pred, true = self.changes(N)
+        simulation = run_simulation(pred, true, N, initial_aum, risk_tolerance, threshold, commission)
+        length = min(len(pred), len(true))
+        return {**simulation, 'Dates': self.data.index[N:N + length]}
+
+    def walk_forward(self, N_values=range(1, 52), lookback=260, step=1, initial_aum=1000000, risk_tolerance=0.75,
+                     threshold=15, commission=0.05):
+        """Out-of-sample run that re-picks N from the trailing ``lookback`` weeks; see ``ngforecast.walk_forward``."""
+        with instrumentation.stage('walk-forward', horizons=len(N_values)):
+            return walk_forward(self.predictions, self.y_true, self.data.index, N_values, lookback, step,
+                                initial_aum, risk_tolerance, threshold, commission)
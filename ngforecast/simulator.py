@@ -0,0 +1,198 @@
+"""Array-backed position ledger shared by N_finder.py and test_sim.py."""
+
+import numpy as np
+
+from ngforecast import instrumentation
+from ngforecast.metrics import MetricAccumulator, years_between
+
+# Bump whenever the trading rules or the metrics they produce change; cached results of
+# other versions are then ignored (see ngforecast.result_cache)
+SIMULATOR_VERSION = 1
+
+
+def run_simulation(percentage_changes_pred, percentage_changes_true, N, initial_aum=1000000,
+                   risk_tolerance=0.75, threshold=15, commission=0.05, accumulator=None):
+    """Replay the threshold trading rules over aligned N-week percentage changes.
+
+    Positions live in preallocated arrays (at most one is opened per week) and exits
+    are found through per-exit-week buckets, so each week costs O(1) plus the
+    positions that actually settle in it. Settled P&L is also fed to ``accumulator``
+    (a ``MetricAccumulator``) when one is given.
+    """
+    pred = np.asarray(percentage_changes_pred, dtype=np.float64)
+    true = np.asarray(percentage_changes_true, dtype=np.float64)
+    length = min(len(pred), len(true))
+    pred_list = pred[:length].tolist()
+    true_list = true[:length].tolist()
+
+    # Ledger, one slot per opened position
+    sizes = np.zeros(length)
+    directions = np.zeros(length)
+    entry_index = np.zeros(length, dtype=np.int64)
+    exit_index = np.zeros(length, dtype=np.int64)
+    next_in_bucket = np.full(length, -1, dtype=np.int64)
+
+    # Exit buckets keyed by exit week, kept in opening order
+    bucket_head = np.full(length, -1, dtype=np.int64)
+    bucket_tail = np.full(length, -1, dtype=np.int64)
+
+    position_values = np.zeros(length)
+    portfolio_values = np.zeros(length)
+    settled_slots = np.zeros(length, dtype=np.int64)
+
+    max_risk_amount = initial_aum * risk_tolerance
+    portfolio_value = initial_aum
+    available_balance = initial_aum
+    n_positions = 0
+    n_settled = 0
+    capped = 0
+    rejected = 0
+    last = length - 1
+
+    with instrumentation.stage('simulate', per_n=True, N=N):
+        for i in range(length):
+            change = pred_list[i]
+            if abs(change) > threshold:
+                position_size = max_risk_amount * abs(change) / 100
+                if position_size > available_balance:
+                    position_size = available_balance
+                    capped += 1
+
+                if position_size > 0:
+                    exit_i = i + N if i + N < length else last
+                    slot = n_positions
+                    sizes[slot] = position_size
+                    directions[slot] = (change > 0) - (change < 0)
+                    entry_index[slot] = i
+                    exit_index[slot] = exit_i
+                    tail = bucket_tail[exit_i]
+                    if tail < 0:
+                        bucket_head[exit_i] = slot
+                    else:
+                        next_in_bucket[tail] = slot
+                    bucket_tail[exit_i] = slot
+                    n_positions += 1
+                    available_balance -= position_size
+                else:
+                    rejected += 1
+
+            slot = bucket_head[i]
+            if slot >= 0:
+                realised_change = true_list[i - N]
+                while slot >= 0:
+                    size = sizes[slot]
+                    profit_loss = (size * realised_change / 100 * directions[slot]) - size * commission
+                    portfolio_value += profit_loss
+                    available_balance += size + profit_loss
+                    position_values[n_settled] = profit_loss
+                    portfolio_values[n_settled] = portfolio_value
+                    settled_slots[n_settled] = slot
+                    n_settled += 1
+                    if accumulator is not None:
+                        accumulator.update(profit_loss)
+                    slot = next_in_bucket[slot]
+
+    if instrumentation.enabled():
+        instrumentation.count('simulations')
+        instrumentation.count('positions opened', n_positions)
+        instrumentation.count('positions settled', n_settled)
+        instrumentation.count('capital-cap capped', capped)
+        instrumentation.count('capital-cap rejections', rejected)
+
+    return {
+        'Position Values': position_values[:n_settled],
+        'Portfolio Values': portfolio_values[:n_settled],
+        'Settled Slots': settled_slots[:n_settled],
+        'Size': sizes[:n_positions],
+        'Direction': directions[:n_positions],
+        'Entry Index': entry_index[:n_positions],
+        'Exit Index': exit_index[:n_positions],
+        'Final Portfolio Value': portfolio_value,
+        'Available Balance': available_balance,
+    }
+
+
+def compute_metrics(position_values, dates, initial_aum=1000000):
+    """Sharpe, drawdown, CAGR, trade count and win rate from the settled P&L of one simulation."""
+    accumulator = MetricAccumulator(initial_aum)
+    for profit_loss in np.asarray(position_values, dtype=np.float64).tolist():
+        accumulator.update(profit_loss)
+    return accumulator.metrics(years_between(dates))
+
+
+def backtest_arrays(N, percentage_changes_pred, percentage_changes_true, index, initial_aum=1000000,
+                    risk_tolerance=0.75, threshold=15, commission=0.05, curves=True):
+    """Simulate one horizon and return the N_finder result row.
+
+    Metrics come from a ``MetricAccumulator`` fed as positions settle; the equity
+    curve and trade dates are only materialised when ``curves`` is true. ``index``
+    is the full date index of the feature matrix; the trading dates are
+    ``index[N:N + len(changes)]`` as in the original scripts.
+    """
+    min_length = min(len(percentage_changes_pred), len(percentage_changes_true))
+    dates = index[N:N + min_length]
+    accumulator = MetricAccumulator(initial_aum)
+    simulation = run_simulation(percentage_changes_pred, percentage_changes_true, N, initial_aum,
+                                risk_tolerance, threshold, commission, accumulator)
+    result = {'N': N, **accumulator.metrics(years_between(dates))}
+
+    if curves:
+        trade_index = simulation['Entry Index'][simulation['Settled Slots']]
+        result['Portfolio Values'] = simulation['Portfolio Values'].tolist()
+        result['Trade Dates'] = list(dates[trade_index])
+    return result
+
+
+class PositionLedger:
+    """Preallocated open-position store with exits bucketed by exit week.
+
+    Used by the simulators that carry state across calls (walk-forward); the batch
+    ``run_simulation`` loop inlines the same layout for speed.
+    """
+
+    def __init__(self, n_weeks, capacity=None):
+        capacity = capacity or max(n_weeks, 1)
+        self.size = np.zeros(capacity)
+        self.direction = np.zeros(capacity)
+        self.entry_index = np.zeros(capacity, dtype=np.int64)
+        self.exit_index = np.zeros(capacity, dtype=np.int64)
+        self.realised_change = np.full(capacity, np.nan)
+        self.count = 0
+        self._next = np.full(capacity, -1, dtype=np.int64)
+        self._head = np.full(n_weeks, -1, dtype=np.int64)
+        self._tail = np.full(n_weeks, -1, dtype=np.int64)
+
+    def _grow(self):
+        capacity = len(self.size) * 2
+        for name, fill in (('size', 0), ('direction', 0), ('entry_index', 0), ('exit_index', 0),
+                           ('realised_change', np.nan), ('_next', -1)):
+            old = getattr(self, name)
+            new = np.full(capacity, fill, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def open(self, size, direction, entry_i, exit_i, realised_change=np.nan):
+        """Record a position and queue it for settlement in week ``exit_i``; returns its slot."""
+        if self.count == len(self.size):
+            self._grow()
+        slot = self.count
+        self.size[slot] = size
+        self.direction[slot] = direction
+        self.entry_index[slot] = entry_i
+        self.exit_index[slot] = exit_i
+        self.realised_change[slot] = realised_change
+        tail = self._tail[exit_i]
+        if tail < 0:
+            self._head[exit_i] = slot
+        else:
+            self._next[tail] = slot
+        self._tail[exit_i] = slot
+        self.count += 1
+        return slot
+
+    def exits(self, week):
+        """Slots settling in ``week``, in the order they were opened."""
+        slot = self._head[week]
+        while slot >= 0:
+            yield slot
+            slot = self._next[slot]
@@ -0,0 +1,116 @@
+"""Event-driven simulator that consumes one bar at a time."""
+
+import heapq
+from collections import deque
+
+import numpy as np
+
+from ngforecast import instrumentation
+from ngforecast.metrics import MetricAccumulator, years_between
+
+
+class StreamingSimulator:
+    """Bar-by-bar version of the test_sim.py trading rules for live use and replay.
+
+    ``on_bar`` scores the row, opens a position when the predicted N-week change
+    passes the threshold and settles the positions whose exit bar (entry bar + N) has
+    arrived, using a min-heap keyed on exit bar. Only the last N predictions and prices,
+    the open positions (at most N) and a ``MetricAccumulator`` are kept, so memory
+    does not grow with the number of bars. Replaying a history gives the same trades
+    as ``run_simulation``, except that positions still open at the end stay open
+    instead of being settled on the last week. CAGR years run from the first bar
+    that can trade (bar N) to the latest bar, as ``backtest_arrays`` measures them.
+    """
+
+    def __init__(self, model, N, initial_aum=1000000, risk_tolerance=0.75, threshold=15, commission=0.05):
+        self.model = model
+        self.N = N
+        self.initial_aum = initial_aum
+        self.risk_tolerance = risk_tolerance
+        self.threshold = threshold
+        self.commission = commission
+
+        self.available_balance = initial_aum
+        self.bar = -1
+        self.first_date = None  # Date of bar N, the first that can trade
+        self.last_date = None
+        self._predictions = deque(maxlen=N + 1)
+        self._prices = deque(maxlen=N + 1)
+        self._open_positions = []
+        self._sequence = 0
+        self.accumulator = MetricAccumulator(initial_aum)
+
+    def on_bar(self, date, features, price, prediction=None):
+        """Process one bar; returns the position opened (if any) and the trades settled on it.
+
+        ``prediction`` skips scoring when the model output for this bar is already known.
+        """
+        self.bar += 1
+        if self.bar == self.N:
+            self.first_date = date
+        self.last_date = date
+        if prediction is None:
+            row = np.asarray(features, dtype=np.float64).reshape(1, -1)
+            prediction = float(instrumentation.predict(self.model, row)[0])
+        self._predictions.append(prediction)
+        self._prices.append(price)
+
+        opened = None
+        if len(self._predictions) > self.N:
+            base_prediction, base_price = self._predictions[0], self._prices[0]
+            change = ((prediction - base_prediction) / base_prediction) * 100
+            if abs(change) > self.threshold:
+                position_size = self.initial_aum * self.risk_tolerance * abs(change) / 100
+                if position_size > self.available_balance:
+                    position_size = self.available_balance
+
+                if position_size > 0:
+                    opened = {
+                        'direction': 'LONG' if change > 0 else 'SHORT',
+                        'size': position_size,
+                        'entry_date': date,
+                        'position_direction': (change > 0) - (change < 0),
+                        # Same realised change run_simulation books for this entry
+                        'realised_change': ((price - base_price) / base_price) * 100,
+                    }
+                    heapq.heappush(self._open_positions, (self.bar + self.N, self._sequence, opened))
+                    self._sequence += 1
+                    self.available_balance -= position_size
+
+        settled = []
+        while self._open_positions and self._open_positions[0][0] <= self.bar:
+            position = heapq.heappop(self._open_positions)[2]
+            size = position['size']
+            profit_loss = (size * position['realised_change'] / 100 * position['position_direction']) \
+                - size * self.commission
+            self.available_balance += size + profit_loss
+            self.accumulator.update(profit_loss)
+            settled.append({**position, 'exit_date': date, 'profit_loss': profit_loss})
+
+        return {'opened': opened, 'settled': settled}
+
+    @property
+    def open_positions(self):
+        return [position for _, _, position in sorted(self._open_positions)]
+
+    @property
+    def portfolio_value(self):
+        return self.accumulator.portfolio_value
+
+    def metrics(self):
+        """Current metrics from the running accumulator."""
+        dates = [self.first_date, self.last_date] if self.bar > self.N else []
+        return self.accumulator.metrics(years_between(dates))
+
+    def replay(self, data, target, predictions=None):
+        """Feed every row of ``data`` (indexed by DATE) through ``on_bar`` and return the metrics.
+
+        The model is called once for the whole frame unless ``predictions`` is given.
+        """
+        features = [col for col in data.columns if col not in [target]]
+        if predictions is None:
+            predictions = instrumentation.predict(self.model, data[features])
+        prices = data[target].to_numpy()
+        for date, price, prediction in zip(data.index, prices.tolist(), np.asarray(predictions).tolist()):
+            self.on_bar(date, None, price, prediction)
+        return self.metrics()
@@ -0,0 +1,81 @@
+"""Predict-once sweep over the holding horizon N."""
+
+import numpy as np
+
+from ngforecast import instrumentation
+from ngforecast.metrics import TopK, rank_score
+from ngforecast.simulator import backtest_arrays
+
+
+def percentage_change_matrix(values, N_values):
+    """Percentage change over every horizon in ``N_values`` as an (N x week) matrix.
+
+    Row ``k`` holds ``(values[i + N] - values[i]) / values[i] * 100`` for
+    ``N = N_values[k]``; weeks without an N-week future are NaN.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    horizons = np.asarray(list(N_values), dtype=np.int64)
+    weeks = np.arange(len(values))
+    future = weeks[None, :] + horizons[:, None]
+    valid = future < len(values)
+    future_values = values[np.where(valid, future, 0)]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        matrix = ((future_values - values[None, :]) / values[None, :]) * 100
+    matrix[~valid] = np.nan
+    return matrix
+
+
+def horizon_changes(matrix, row, N):
+    """Valid (non-padded) part of one horizon's row, same as the old per-N list."""
+    return matrix[row, :max(matrix.shape[1] - N, 0)]
+
+
+def sweep_N(predictions, y_true, index, N_values=range(1, 52), initial_aum=1000000,
+            risk_tolerance=0.75, threshold=15, commission=0.05, keep_curves=0, rank_by='Sharpe Ratio',
+            cache=None):
+    """Backtest every N from a single set of model predictions.
+
+    The predicted and true percentage changes for all horizons are built once as
+    2-D matrices and each row is fed to the simulator. Rows carry metrics only;
+    ``Portfolio Values`` and ``Trade Dates`` are re-simulated for the ``keep_curves``
+    best rows by ``rank_by``, so no curve is built for the other horizons.
+    With a ``ResultCache``, points already stored are read back instead of
+    simulated and new points are written as they finish.
+    """
+    horizons = list(N_values)
+    params = (risk_tolerance, threshold, initial_aum, commission)
+    cached = [cache.get(N, *params) if cache is not None else None for N in horizons]
+    missing = [N for N, result in zip(horizons, cached) if result is None]
+    instrumentation.count('cached backtests', len(horizons) - len(missing))
+
+    with instrumentation.stage('percentage changes', horizons=len(missing)):
+        pred_matrix = percentage_change_matrix(predictions, missing)
+        true_matrix = percentage_change_matrix(y_true, missing)
+    matrix_row = {N: row for row, N in enumerate(missing)}
+
+    def backtest(N, curves):
+        row = matrix_row.get(N)
+        if row is None:
+            return backtest_arrays(N, *[horizon_changes(percentage_change_matrix(values, [N]), 0, N)
+                                        for values in (predictions, y_true)],
+                                   index, initial_aum, risk_tolerance, threshold, commission, curves)
+        return backtest_arrays(N, horizon_changes(pred_matrix, row, N), horizon_changes(true_matrix, row, N),
+                               index, initial_aum, risk_tolerance, threshold, commission, curves)
+
+    results = []
+    top = TopK(keep_curves)
+    for row, N in enumerate(horizons):
+        result = cached[row]
+        if result is None:
+            with instrumentation.stage('backtest', per_n=True, N=N):
+                result = backtest(N, False)
+            if cache is not None:
+                cache.put(result, *params)
+        top.push(rank_score(result, rank_by), row, None)
+        results.append(result)
+
+    # Curves only for the few rows that made the top
+    for row, _ in top.items():
+        curve = backtest(horizons[row], True)
+        results[row].update({'Portfolio Values': curve['Portfolio Values'], 'Trade Dates': curve['Trade Dates']})
+    return results
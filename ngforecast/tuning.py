@@ -0,0 +1,105 @@
+"""Budgeted hyperparameter search for the CatBoost model (successive halving on iterations)."""
+
+import math
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+def sample_candidates(param_grid, n_candidates, random_state=42, exclude=('iterations',)):
+    """Distinct random parameter combinations from ``param_grid`` (``exclude`` left out)."""
+    grid = {name: list(values) for name, values in param_grid.items() if name not in exclude}
+    names = sorted(grid)
+    total = math.prod(len(grid[name]) for name in names)
+    rng = random.Random(random_state)
+    chosen = rng.sample(range(total), min(n_candidates, total))
+
+    candidates = []
+    for flat in chosen:
+        params = {}
+        for name in names:
+            flat, position = divmod(flat, len(grid[name]))
+            params[name] = grid[name][position]
+        candidates.append(params)
+    return candidates
+
+
+def thread_budget(n_threads=None, trial_workers=None):
+    """Split ``n_threads`` between parallel trials and CatBoost threads per trial."""
+    n_threads = n_threads or os.cpu_count() or 1
+    trial_workers = max(min(trial_workers or max(n_threads // 4, 1), n_threads), 1)
+    return trial_workers, max(n_threads // trial_workers, 1)
+
+
+def _fit_trial(trial, budget, X_fit, y_fit, X_eval, y_eval, thread_count, early_stopping_rounds, random_state):
+    import catboost as cb
+
+    model = cb.CatBoostRegressor(**trial['params'], iterations=budget - trial['trees'], loss_function='MAE',
+                                 eval_metric='MAE', thread_count=thread_count, random_seed=random_state,
+                                 verbose=0)
+    model.fit(X_fit, y_fit, eval_set=(X_eval, y_eval), early_stopping_rounds=early_stopping_rounds,
+              use_best_model=True, init_model=trial['model'])
+    # use_best_model shrinks the model, so fewer trees than the budget means it stopped improving
+    trial['stopped'] = model.tree_count_ < budget
+    trial['model'] = model
+    trial['trees'] = model.tree_count_
+    trial['score'] = model.get_best_score()['validation']['MAE']
+    return trial
+
+
+def successive_halving(X_train, y_train, param_grid, n_candidates=50, min_iterations=100, max_iterations=1000,
+                       eta=3, eval_fraction=0.2, early_stopping_rounds=50, n_threads=None, trial_workers=None,
+                       time_budget=None, random_state=42, verbose=True):
+    """Successive halving over the iteration budget with eval-set early stopping.
+
+    Every candidate starts with ``min_iterations`` trees; after each rung the best
+    ``1 / eta`` continue boosting from where they stopped (``init_model``) with ``eta``
+    times the budget, up to ``max_iterations``. Trials that early-stopped are not
+    extended. Trials run ``trial_workers`` at a time, each with its share of
+    ``n_threads`` CatBoost threads, and no new trial starts after ``time_budget``
+    seconds. The eval set is the latest ``eval_fraction`` of the rows by index (date).
+    Returns ``(best_params, best_score)``; ``best_params['iterations']`` is the tree
+    count of the best model, so it can be refitted as before.
+    """
+    deadline = time.monotonic() + time_budget if time_budget else None
+    trial_workers, thread_count = thread_budget(n_threads, trial_workers)
+
+    # Early stopping is judged on the latest weeks, so the split is made in time order even
+    # when the caller's training rows come from a shuffled split
+    X_train, y_train = X_train.sort_index(kind='stable'), y_train.sort_index(kind='stable')
+    n_eval = max(int(len(X_train) * eval_fraction), 1)
+    X_fit, y_fit = X_train.iloc[:-n_eval], y_train.iloc[:-n_eval]
+    X_eval, y_eval = X_train.iloc[-n_eval:], y_train.iloc[-n_eval:]
+
+    trials = [{'params': params, 'model': None, 'trees': 0, 'score': np.inf, 'stopped': False}
+              for params in sample_candidates(param_grid, n_candidates, random_state)]
+    survivors = trials
+    budget = min_iterations
+
+    with ThreadPoolExecutor(max_workers=trial_workers) as pool:
+        while survivors:
+            pending = [trial for trial in survivors if not trial['stopped'] and trial['trees'] < budget]
+            futures = []
+            for trial in pending:
+                if deadline is not None and time.monotonic() > deadline:
+                    break
+                futures.append(pool.submit(_fit_trial, trial, budget, X_fit, y_fit, X_eval, y_eval,
+                                           thread_count, early_stopping_rounds, random_state))
+            for future in futures:
+                future.result()
+
+            survivors = sorted(survivors, key=lambda trial: trial['score'])
+            if verbose:
+                print(f"Rung with {budget} iterations: {len(futures)} trials, best MAE {survivors[0]['score']}")
+            if budget >= max_iterations or (deadline is not None and time.monotonic() > deadline):
+                break
+            survivors = survivors[:max(len(survivors) // eta, 1)]
+            budget = min(budget * eta, max_iterations)
+
+    best = min(trials, key=lambda trial: trial['score'])
+    if best['model'] is None:
+        raise RuntimeError(f"No trial finished within the time budget of {time_budget} seconds.")
+    return {**best['params'], 'iterations': int(best['trees'])}, best['score']
@@ -0,0 +1,128 @@
+"""Walk-forward re-optimisation of N with out-of-sample trading."""
+
+import numpy as np
+import pandas as pd
+
+from ngforecast import instrumentation
+from ngforecast.simulator import PositionLedger, compute_metrics, run_simulation
+from ngforecast.sweep import horizon_changes, percentage_change_matrix
+
+
+def _settlement_prefix_sums(pred_matrix, true_matrix, horizons, n_weeks, initial_aum, risk_tolerance,
+                            threshold, commission):
+    """Per-N prefix sums of trade count, centred P&L and squared centred P&L by settlement week.
+
+    Each N is simulated once over the whole history; the simulator is causal, so the
+    trades that settled inside any window are exactly what was known at its end, and
+    window statistics are a difference of two prefix sums. P&L is centred on each N's
+    mean before summing, so the window variance is not a difference of two large,
+    nearly equal numbers; the centres are returned to restore the window means.
+    """
+    counts = np.zeros((len(horizons), n_weeks + 1))
+    sums = np.zeros((len(horizons), n_weeks + 1))
+    squares = np.zeros((len(horizons), n_weeks + 1))
+    centres = np.zeros((len(horizons), 1))
+
+    for row, N in enumerate(horizons):
+        simulation = run_simulation(horizon_changes(pred_matrix, row, N), horizon_changes(true_matrix, row, N),
+                                    N, initial_aum, risk_tolerance, threshold, commission)
+        pnl = np.asarray(simulation['Position Values'], dtype=np.float64)
+        if len(pnl):
+            centres[row] = pnl.mean()
+        deviation = pnl - centres[row]
+        # Simulation step j trades on calendar week j + N (dates = index[N:])
+        weeks = simulation['Exit Index'][simulation['Settled Slots']] + N
+        np.add.at(counts[row], weeks + 1, 1)
+        np.add.at(sums[row], weeks + 1, deviation)
+        np.add.at(squares[row], weeks + 1, deviation ** 2)
+
+    return np.cumsum(counts, axis=1), np.cumsum(sums, axis=1), np.cumsum(squares, axis=1), centres
+
+
+def _window_sharpe(counts, sums, squares, centres):
+    """Annualised Sharpe of each window from its count and centred P&L sums."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        shift = sums / counts
+        std = np.sqrt(np.maximum(squares / counts - shift ** 2, 0))
+        sharpe = (centres + shift) / std * np.sqrt(12)
+    return np.where((counts > 0) & (std > 0), sharpe, 0)
+
+
+def walk_forward(predictions, y_true, index, N_values=range(1, 52), lookback=260, step=1, initial_aum=1000000,
+                 risk_tolerance=0.75, threshold=15, commission=0.05):
+    """Re-pick N every ``step`` weeks from the trailing ``lookback`` weeks and trade the next window with it.
+
+    Predictions and per-N percentage changes are computed once for the whole
+    history, and the out-of-sample portfolio (open positions, balances) carries over
+    from one window to the next. Returns the out-of-sample equity curve, the per-window
+    N history and the usual metrics.
+    """
+    horizons = list(N_values)
+    n_weeks = len(index)
+    pred_matrix = percentage_change_matrix(predictions, horizons)
+    true_matrix = percentage_change_matrix(y_true, horizons)
+    with instrumentation.stage('walk-forward scoring', horizons=len(horizons)):
+        counts, sums, squares, centres = _settlement_prefix_sums(pred_matrix, true_matrix, horizons, n_weeks,
+                                                                 initial_aum, risk_tolerance, threshold, commission)
+
+    # In-sample score of every N for every re-optimisation week in one shot
+    start = min(lookback, n_weeks)
+    decision_weeks = np.arange(start, n_weeks, step)
+    window_start = decision_weeks - lookback
+    window_sharpe = _window_sharpe(counts[:, decision_weeks] - counts[:, window_start],
+                                   sums[:, decision_weeks] - sums[:, window_start],
+                                   squares[:, decision_weeks] - squares[:, window_start], centres)
+    best_rows = np.argmax(window_sharpe, axis=0) if len(horizons) else np.zeros(0, dtype=np.int64)
+
+    n_history = pd.DataFrame({
+        'DATE': index[decision_weeks],
+        'N': np.asarray(horizons, dtype=np.int64)[best_rows],
+        'In-Sample Sharpe': window_sharpe[best_rows, np.arange(len(decision_weeks))],
+        'In-Sample Trades': counts[best_rows, decision_weeks] - counts[best_rows, window_start],
+    })
+
+    # Out-of-sample trading, state carried across windows. Each position keeps the N it
+    # was opened with and settles on its own realised change.
+    ledger = PositionLedger(n_weeks)
+    max_risk_amount = initial_aum * risk_tolerance
+    portfolio_value = initial_aum
+    available_balance = initial_aum
+    position_values = []
+    equity = np.full(n_weeks, float(initial_aum))
+    active_N = np.zeros(n_weeks, dtype=np.int64)
+    row = N = None
+    decision = 0
+
+    for t in range(start, n_weeks):
+        if decision < len(decision_weeks) and decision_weeks[decision] == t:
+            row = best_rows[decision]
+            N = horizons[row]
+            decision += 1
+        active_N[t] = N
+
+        i = t - N
+        if i >= 0:
+            change = pred_matrix[row, i]
+            if abs(change) > threshold:
+                position_size = min(max_risk_amount * abs(change) / 100, available_balance)
+                if position_size > 0:
+                    ledger.open(position_size, np.sign(change), t, min(t + N, n_weeks - 1), true_matrix[row, i])
+                    available_balance -= position_size
+
+        for slot in ledger.exits(t):
+            size = ledger.size[slot]
+            profit_loss = (size * ledger.realised_change[slot] / 100 * ledger.direction[slot]) - size * commission
+            portfolio_value += profit_loss
+            available_balance += size + profit_loss
+            position_values.append(profit_loss)
+
+        equity[t] = portfolio_value
+
+    equity_curve = pd.DataFrame({'N': active_N[start:], 'Portfolio Value': equity[start:]}, index=index[start:])
+    metrics = compute_metrics(position_values, index[start:], initial_aum)
+
+    return {
+        **metrics,
+        'Equity Curve': equity_curve,
+        'N History': n_history,
+    }
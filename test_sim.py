@@ -1,159 +1,137 @@
-"""Trade simulator and backtester"""
+"""Trade simulator and backtester
 
-import pandas as pd
-import catboost as cb
-import json
+Importable: the model and data are loaded on first use through a ``BacktestSession``
+and matplotlib only when a figure is written. ``--N`` takes several horizons, which are
+simulated in one process on one set of predictions; ``--output-dir`` writes each order
+book as CSV plus the change and portfolio figures, headless. ``--bootstrap N_PATHS``
+adds the metric distribution over block-bootstrapped histories of each horizon.
+"""
+
+import argparse
 import os
+
 import numpy as np
-import matplotlib.pyplot as plt
-import talib
-
-
-model_file_path = 'NG_new/catboost_ng_model.bin'
-params_file_path = 'NG_new/best_params.json'
-
-if os.path.exists(model_file_path):
-    loaded_model = cb.CatBoostRegressor()
-    loaded_model.load_model(model_file_path)
-else:
-    raise FileNotFoundError(f"Model file {model_file_path} does not exist.")
-
-if os.path.exists(params_file_path):
-    with open(params_file_path, 'r') as f:
-        loaded_best_params = json.load(f)
-    print("Loaded Best Parameters:", loaded_best_params)
-else:
-    raise FileNotFoundError(f"Parameters file {params_file_path} does not exist.")
-
-# Load and prepare data
-new_data = pd.read_csv('NG_new/test.csv')
-new_data['DATE'] = pd.to_datetime(new_data['DATE'])
-new_data.set_index('DATE', inplace=True)
-
-features = [col for col in new_data.columns if col not in ['Natural Gas Futures Contract 1 $/MMBTU']]
-weekly_X = new_data[features]
-weekly_predictions = loaded_model.predict(weekly_X)
-
-def calculate_percentage_change(values, N):
-    pct_changes = []
-    for i in range(len(values) - N):
-        pct_change = ((values[i + N] - values[i]) / values[i]) * 100
-        pct_changes.append(pct_change)
-    return pct_changes
-
-N = 37  # Number of weeks ahead for percentage change calculation and position duration
-
-percentage_changes_pred = calculate_percentage_change(weekly_predictions, N)
-# print(f"Percentage changes for the next {N} weeks (predictions):", percentage_changes_pred) #Line for debugging
-
-y_true = new_data['Natural Gas Futures Contract 1 $/MMBTU'].values
-percentage_changes_true = calculate_percentage_change(y_true, N)
-# print(f"Percentage changes for the next {N} weeks (ground truth):", percentage_changes_true) #Line for debugging
-# plt.plot(y_true, label=f'Actual NG Spot Price', color='blue', marker='o')
-# plt.plot(weekly_predictions, label=f'Predicted NG Spot Price', color='red', marker='x')
-# plt.legend()
-# plt.grid(True)
-# plt.show() #Plot for verifying predictions
-
-min_length = min(len(percentage_changes_pred), len(percentage_changes_true))
-percentage_changes_pred = percentage_changes_pred[:min_length]
-percentage_changes_true = percentage_changes_true[:min_length]
-dates = new_data.index[N:N + min_length]
-
-# Simulator
-initial_aum = 1000000  # AUM
-risk_tolerance = 0.75  # Risk factor
-threshold = 15
-max_risk_amount = initial_aum * risk_tolerance
-
-portfolio_value = initial_aum
-available_balance = initial_aum
-position_values = []
-portfolio_values = []
-order_book = []
-trade_dates = []
-entry_exit_dates = []
-open_positions = []
-
-for i in range(len(percentage_changes_pred)):
-    position_size = max_risk_amount * abs(percentage_changes_pred[i]) / 100
-    position_direction = np.sign(percentage_changes_pred[i])
-    entry_date = dates[i]
-    exit_date = dates[i + N] if i + N < len(dates) else dates[-1]
-
-    if abs(percentage_changes_pred[i]) > threshold:
-        if position_size > available_balance:
-            position_size = available_balance
-
-        if position_size > 0:
-            direction = 'LONG' if position_direction > 0 else 'SHORT'
-            order_book.append((direction, position_size, entry_date, exit_date))
-            open_positions.append({
-                'direction': direction,
-                'size': position_size,
-                'entry_date': entry_date,
-                'exit_date': exit_date,
-                'position_direction': position_direction
-            })
-            available_balance -= position_size
-
-    position_exits = []
-    for position in open_positions:
-        if position['exit_date'] == entry_date:
-            profit_loss = (position['size'] * percentage_changes_true[i - N] / 100 * position['position_direction']) - position['size'] * 0.05  # Includes 5% commission
-            portfolio_value += profit_loss
-            available_balance += position['size'] + profit_loss
-            position_values.append(profit_loss)
-            portfolio_values.append(portfolio_value)
-            trade_dates.append(position['entry_date'])
-            entry_exit_dates.append((position['entry_date'], position['exit_date']))
-            position_exits.append(position)
-
-    for position in position_exits:
-        open_positions.remove(position)
-
-# Metrics
-returns = np.array(position_values)
-mean_return = np.mean(returns) if len(returns) > 0 else 0
-std_return = np.std(returns) if len(returns) > 0 else 1
-sharpe_ratio = mean_return / std_return * np.sqrt(12) if std_return != 0 else 0
-
-cumulative_returns = np.cumsum(returns)
-running_max = np.maximum.accumulate(cumulative_returns)
-drawdown = cumulative_returns - running_max
-max_drawdown = drawdown.min() if len(drawdown) > 0 else 0
-years = (dates[-1] - dates[0]).days / 365.25 if len(dates) > 1 else 1
-cagr = ((portfolio_value / initial_aum) ** (1 / years) - 1) * 100 if years != 0 else 0
-
-print(f'Initial AUM: {initial_aum}')
-print(f'Risk: {risk_tolerance * 100}%')
-print(f'N: {N} weeks')
-print(f'Sharpe Ratio: {sharpe_ratio}')
-print(f'Maximum Drawdown: {max_drawdown}')
-print(f'Max DD %: {(np.abs(max_drawdown) / initial_aum) * 100}%')
-print(f'Final Portfolio Value: {portfolio_value}')
-print(f'CAGR: {cagr}')
-
-print("\nOrder Book:")
-print("Direction\tSize\tEntry Date\tExit Date")
-for order in order_book:
-    exit_date_str = order[3].strftime('%Y-%m-%d') if order[3] is not None else 'N/A'
-    print(f"{order[0]}\t{order[1]:.2f}\t{order[2].strftime('%Y-%m-%d')}\t{exit_date_str}")
-
-# plt.figure(figsize=(10, 6))
-# plt.plot(dates, percentage_changes_true, label=f'Actual NG Spot Price (percent change, next {N} week(s))', color='blue', marker='o')
-# plt.plot(dates, percentage_changes_pred, label=f'Predicted NG Spot Price (percent change, next {N} week(s))', color='red', marker='x')
-# plt.xlabel('Date')
-# plt.ylabel('NG Spot Price change (%)')
-# plt.title('Actual vs Predicted changes in NG Spot Price')
-# plt.legend()
-# plt.grid(True)
-# plt.show()
-
-# plt.figure(figsize=(10, 6))
-# plt.plot(trade_dates, portfolio_values, marker='o')
-# plt.xlabel('Date')
-# plt.ylabel('Portfolio Value')
-# plt.title(f'Portfolio Value Over Time (CAGR: {cagr:.2f}%, Sharpe ratio: {sharpe_ratio:.2f}, Max DD %: {((np.abs(max_drawdown) / initial_aum) * 100):.2f}%)')
-# plt.grid(True)
-# plt.show()
\ No newline at end of file
+import pandas as pd
+
+from ngforecast import instrumentation, plots
+from ngforecast.config import DATASET_PATH, MODEL_FILE_PATH, PARAMS_FILE_PATH, SCHEMA_PATH, TEST_DATA_PATH
+from ngforecast.monte_carlo import bootstrap_backtest
+from ngforecast.session import BacktestSession
+from ngforecast.simulator import compute_metrics
+
+
+def simulate(session, N=37, initial_aum=1000000, risk_tolerance=0.75, threshold=15):
+    """Simulate one horizon ``N``; returns the metrics, order book and portfolio curve."""
+    simulation = session.simulate(N, initial_aum, risk_tolerance, threshold)
+    dates = simulation['Dates']
+    settled_slots = simulation['Settled Slots']
+    order_book = [
+        ('LONG' if direction > 0 else 'SHORT', size, dates[entry], dates[exit_i])
+        for direction, size, entry, exit_i in zip(simulation['Direction'], simulation['Size'],
+                                                 simulation['Entry Index'], simulation['Exit Index'])
+    ]
+    percentage_changes_pred, percentage_changes_true = session.changes(N)
+    return {
+        'N': N,
+        'Initial AUM': initial_aum,
+        'Risk Tolerance': risk_tolerance,
+        'Final Portfolio Value': simulation['Final Portfolio Value'],
+        'Metrics': compute_metrics(simulation['Position Values'], dates, initial_aum),
+        'Order Book': order_book,
+        'Trade Dates': dates[simulation['Entry Index'][settled_slots]],
+        'Portfolio Values': simulation['Portfolio Values'],
+        'Dates': dates,
+        'Changes': (percentage_changes_true[:len(dates)], percentage_changes_pred[:len(dates)]),
+    }
+
+
+def bootstrap(session, N=37, n_paths=10000, block_size=None, initial_aum=1000000, risk_tolerance=0.75,
+              threshold=15):
+    """Block-bootstrap Monte Carlo of the same rules; see ``ngforecast.monte_carlo``."""
+    percentage_changes_pred, percentage_changes_true = session.changes(N)
+    return bootstrap_backtest(percentage_changes_pred, percentage_changes_true, N, session.data.index, n_paths,
+                              block_size, initial_aum, risk_tolerance, threshold)
+
+
+def print_report(result):
+    initial_aum = result['Initial AUM']
+    max_drawdown = result['Metrics']['Max Drawdown']
+    print(f'Initial AUM: {initial_aum}')
+    print(f"Risk: {result['Risk Tolerance'] * 100}%")
+    print(f"N: {result['N']} weeks")
+    print(f"Sharpe Ratio: {result['Metrics']['Sharpe Ratio']}")
+    print(f'Maximum Drawdown: {max_drawdown}')
+    print(f'Max DD %: {(np.abs(max_drawdown) / initial_aum) * 100}%')
+    print(f"Final Portfolio Value: {result['Final Portfolio Value']}")
+    print(f"CAGR: {result['Metrics']['CAGR']}")
+
+    print("\nOrder Book:")
+    print("Direction\tSize\tEntry Date\tExit Date")
+    for order in result['Order Book']:
+        exit_date_str = order[3].strftime('%Y-%m-%d') if order[3] is not None else 'N/A'
+        print(f"{order[0]}\t{order[1]:.2f}\t{order[2].strftime('%Y-%m-%d')}\t{exit_date_str}")
+
+
+def write_outputs(result, output_dir, show=False):
+    """Order book CSV and the change and portfolio figures for one simulated horizon."""
+    paths = {'changes': None, 'portfolio': None}
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        name = f"N{result['N']}_risk{result['Risk Tolerance']:g}"
+        pd.DataFrame(result['Order Book'], columns=['Direction', 'Size', 'Entry Date', 'Exit Date']) \
+            .to_csv(os.path.join(output_dir, f'orders_{name}.csv'), index=False)
+        if 'Bootstrap' in result:
+            result['Bootstrap']['Summary'].to_csv(os.path.join(output_dir, f'bootstrap_{name}.csv'))
+        paths = {kind: os.path.join(output_dir, f'{kind}_{name}.png') for kind in paths}
+
+    metrics = result['Metrics']
+    max_dd_pct = (np.abs(metrics['Max Drawdown']) / result['Initial AUM']) * 100
+    with instrumentation.stage('plot'):
+        plots.plot_changes(result['Dates'], *result['Changes'], result['N'], paths['changes'], show)
+        plots.plot_portfolio(result['Trade Dates'], result['Portfolio Values'],
+                             f"Portfolio Value Over Time (CAGR: {metrics['CAGR']:.2f}%, Sharpe ratio: "
+                             f"{metrics['Sharpe Ratio']:.2f}, Max DD %: {max_dd_pct:.2f}%)", paths['portfolio'], show)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Simulate trading the model forecasts for a holding horizon N.')
+    parser.add_argument('--N', type=int, nargs='+', default=[37],
+                        help='weeks ahead for the percentage change and position duration')
+    parser.add_argument('--initial-aum', type=float, default=1000000)
+    parser.add_argument('--risk-tolerance', type=float, default=0.75)
+    parser.add_argument('--threshold', type=float, default=15)
+    parser.add_argument('--model', default=MODEL_FILE_PATH)
+    parser.add_argument('--params', default=PARAMS_FILE_PATH)
+    parser.add_argument('--data', default=None, help=f'weekly dataset to simulate on (default: {TEST_DATA_PATH})')
+    parser.add_argument('--schema', default=SCHEMA_PATH)
+    parser.add_argument('--oof', default=None, help='simulate out-of-fold predictions from train.py --cv expanding')
+    parser.add_argument('--bootstrap', type=int, default=None, metavar='N_PATHS',
+                        help='also simulate this many block-bootstrapped histories and report the metric spread')
+    parser.add_argument('--block-size', type=int, default=None, help='bootstrap block length in weeks (default: N)')
+    parser.add_argument('--output-dir', default=None, help='write order books, bootstrap summaries and figures here')
+    parser.add_argument('--show', action='store_true', help='also show the figures on screen')
+    args = parser.parse_args(argv)
+
+    data_path = args.data or (DATASET_PATH if args.oof else TEST_DATA_PATH)
+    session = BacktestSession(args.model, args.params, data_path, args.schema, args.oof)
+    if not args.oof:
+        print("Loaded Best Parameters:", session.params)
+    show = args.show and plots.display_available()
+
+    results = []
+    for N in args.N:
+        result = simulate(session, N, args.initial_aum, args.risk_tolerance, args.threshold)
+        print_report(result)
+        if args.bootstrap:
+            result['Bootstrap'] = bootstrap(session, N, args.bootstrap, args.block_size, args.initial_aum,
+                                            args.risk_tolerance, args.threshold)
+            print(f"\nBootstrap over {args.bootstrap} paths:")
+            print(result['Bootstrap']['Summary'].to_string())
+        if args.output_dir or show:
+            write_outputs(result, args.output_dir, show)
+        results.append(result)
+    return results
+
+
+if __name__ == '__main__':
+    main()